@@ -0,0 +1,65 @@
+"""
+JSON rendering and parsing: DRF's JSONRenderer/JSONParser vs roomtime.renderers.
+
+Payloads are the bookings and resources list pages as the API builds them,
+plus a page of raw datetimes (what analytics-style responses carry). Every
+payload must render to identical bytes with both renderers before timing.
+
+    python benchmarks/json_rendering.py [--rows 100] [--repeat 500]
+"""
+import argparse
+import io
+import timeit
+
+from serialization import booking_rows, resource_rows  # also sets up Django
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from bookings.serializers import BookingSerializer
+from rooms.serializers.room_resources import ResourceListSerializer
+from roomtime.renderers import ORJSONParser, ORJSONRenderer
+from roomtime.serialization import ValuesSerializer
+
+
+def payloads(count):
+    bookings = booking_rows(count)
+    return {
+        'bookings': {
+            'next': 'http://testserver/api/bookings/?cursor=eyJmIjoic3RhcnRzX2F0In0',
+            'previous': None,
+            'results': ValuesSerializer(BookingSerializer).many(bookings),
+        },
+        'resources': ValuesSerializer(ResourceListSerializer).many(resource_rows(count)),
+        'datetimes': bookings,
+    }
+
+
+def compare(label, data, repeat):
+    stock, fast = JSONRenderer(), ORJSONRenderer()
+    body = stock.render(data)
+    assert fast.render(data) == body, f"{label}: rendered bytes differ"
+    assert ORJSONParser().parse(io.BytesIO(body)) == JSONParser().parse(io.BytesIO(body))
+
+    per_call = 1000 / repeat
+    render_stock = timeit.timeit(lambda: stock.render(data), number=repeat) * per_call
+    render_fast = timeit.timeit(lambda: fast.render(data), number=repeat) * per_call
+    parse_stock = timeit.timeit(lambda: JSONParser().parse(io.BytesIO(body)), number=repeat) * per_call
+    parse_fast = timeit.timeit(lambda: ORJSONParser().parse(io.BytesIO(body)), number=repeat) * per_call
+    print(f"{label:<10} {len(body):>8} B  render {render_stock:7.3f} -> {render_fast:7.3f} ms "
+          f"(x{render_stock / render_fast:.1f})  parse {parse_stock:7.3f} -> {parse_fast:7.3f} ms "
+          f"(x{parse_stock / parse_fast:.1f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=500)
+    args = parser.parse_args()
+
+    for label, data in payloads(args.rows).items():
+        compare(label, data, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
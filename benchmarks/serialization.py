@@ -0,0 +1,91 @@
+"""
+List serialization: ModelSerializer(many=True) vs roomtime.serialization.
+
+No database is needed. Rows are built the way the ORM would hand them over:
+model instances via Model.from_db() for the serializer path, plain dicts
+for the values() path. Both outputs are rendered with DRF's JSONRenderer
+and must be byte-identical before anything is timed.
+
+    python benchmarks/serialization.py [--rows 100] [--repeat 200]
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'roomtime.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.utils import timezone  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from bookings.models import Booking  # noqa: E402
+from bookings.serializers import BookingSerializer  # noqa: E402
+from rooms.models import Room_Resources  # noqa: E402
+from rooms.serializers.room_resources import ResourceListSerializer  # noqa: E402
+from roomtime.serialization import ValuesSerializer  # noqa: E402
+
+
+def booking_rows(count):
+    now = timezone.now().replace(microsecond=0)
+    rows = []
+    for n in range(count):
+        start = now + timedelta(hours=n)
+        rows.append({
+            'id': n + 1, 'user': n % 50 + 1, 'resource': n % 20 + 1,
+            'starts_at': start, 'ends_at': start + timedelta(hours=1),
+            'status': (Booking.STATUS_PENDING, Booking.STATUS_CONFIRMED)[n % 2],
+            'created_at': now - timedelta(minutes=n),
+        })
+    return rows
+
+
+def resource_rows(count):
+    return [
+        {'id': n + 1, 'name': f'Room {n}', 'location': f'Floor {n % 10}',
+         'capacity': 2 + n % 30, 'is_active': True}
+        for n in range(count)
+    ]
+
+
+def instances(model, rows, columns):
+    # What QuerySet iteration does per row
+    names = [model._meta.get_field(column).attname for column in columns]
+    return [model.from_db('default', names, [row[column] for column in columns]) for row in rows]
+
+
+def compare(label, serializer_class, model, rows, repeat):
+    columns = list(rows[0])
+    objects = instances(model, rows, columns)
+    fast = ValuesSerializer(serializer_class)
+    renderer = JSONRenderer()
+
+    slow_body = renderer.render(serializer_class(objects, many=True).data)
+    fast_body = renderer.render(fast.many(rows))
+    assert slow_body == fast_body, f"{label}: outputs differ"
+
+    slow = timeit.timeit(lambda: serializer_class(instances(model, rows, columns), many=True).data, number=repeat)
+    quick = timeit.timeit(lambda: fast.many(rows), number=repeat)
+    per_page = 1000 / repeat
+    print(f"{label:<10} {len(rows):>5} rows  serializer {slow * per_page:8.3f} ms  "
+          f"values {quick * per_page:8.3f} ms  x{slow / quick:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    compare('bookings', BookingSerializer, Booking, booking_rows(args.rows), args.repeat)
+    compare('resources', ResourceListSerializer, Room_Resources, resource_rows(args.rows), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
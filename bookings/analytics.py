@@ -0,0 +1,124 @@
+"""
+Resource utilization over a date range, computed entirely in Postgres.
+
+Every day of the range contributes one opening window [open_from, open_to)
+in local time. Active bookings are clipped to those windows, so only the
+part of a booking that falls inside opening hours of the requested days
+counts. Only one aggregated row per resource comes back to Python.
+
+Opening-hour clipping and the peak hour need booking-level rows, so
+utilization() reads Booking; whole-day dashboard figures come from the
+ResourceDailyOccupancy rollup via daily_occupancy().
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q, Sum
+
+from .availability import day_bounds
+from .models import Booking, ResourceDailyOccupancy
+
+MAX_RANGE_DAYS = 366
+
+UTILIZATION_SQL = """
+WITH windows AS (
+    SELECT (day + make_interval(hours => %(open_from)s)) AT TIME ZONE %(tz)s AS win_start,
+           (day + make_interval(hours => %(open_to)s)) AT TIME ZONE %(tz)s AS win_end
+    FROM generate_series(%(first_day)s::timestamp, %(last_day)s::timestamp, interval '1 day') AS day
+),
+open_time AS (
+    SELECT SUM(EXTRACT(EPOCH FROM win_end - win_start)) / 3600 AS hours FROM windows
+),
+clipped AS (
+    SELECT b.id, b.resource_id,
+           GREATEST(b.starts_at, w.win_start) AS clip_start,
+           LEAST(b.ends_at, w.win_end) AS clip_end
+    FROM bookings_booking b
+    JOIN windows w ON b.starts_at < w.win_end AND b.ends_at > w.win_start
+    WHERE b.status = ANY(%(statuses)s)
+      AND b.starts_at < %(range_end)s
+      AND b.ends_at > %(range_start)s
+),
+totals AS (
+    SELECT resource_id,
+           SUM(EXTRACT(EPOCH FROM clip_end - clip_start)) / 3600 AS booked_hours,
+           COUNT(DISTINCT id) AS bookings
+    FROM clipped
+    GROUP BY resource_id
+),
+hourly AS (
+    -- Bookings in progress per local hour of day.
+    SELECT resource_id, EXTRACT(HOUR FROM slot)::int AS hour, COUNT(*) AS bookings
+    FROM clipped,
+         generate_series(
+             date_trunc('hour', clip_start AT TIME ZONE %(tz)s),
+             (clip_end AT TIME ZONE %(tz)s) - interval '1 microsecond',
+             interval '1 hour'
+         ) AS slot
+    GROUP BY 1, 2
+),
+peaks AS (
+    SELECT resource_id, hour,
+           ROW_NUMBER() OVER (PARTITION BY resource_id ORDER BY bookings DESC, hour) AS rank
+    FROM hourly
+)
+SELECT r.id AS resource_id,
+       r.name AS resource_name,
+       ROUND(COALESCE(t.booked_hours, 0)::numeric, 2)::float AS booked_hours,
+       ROUND(open_time.hours::numeric, 2)::float AS open_hours,
+       ROUND((COALESCE(t.booked_hours, 0) / NULLIF(open_time.hours, 0))::numeric, 4)::float AS utilization,
+       COALESCE(t.bookings, 0) AS bookings,
+       p.hour AS peak_hour
+FROM rooms_room_resources r
+CROSS JOIN open_time
+LEFT JOIN totals t ON t.resource_id = r.id
+LEFT JOIN peaks p ON p.resource_id = r.id AND p.rank = 1
+WHERE r.is_active
+ORDER BY r.id
+"""
+
+
+def utilization(first_day, last_day, open_from=0, open_to=24):
+    """One dict per active resource for the local days [first_day, last_day]."""
+    range_start, range_end = day_bounds(first_day, last_day)
+    with connection.cursor() as cursor:
+        cursor.execute(UTILIZATION_SQL, {
+            'first_day': first_day,
+            'last_day': last_day,
+            'open_from': open_from,
+            'open_to': open_to,
+            'tz': settings.TIME_ZONE,
+            'statuses': list(Booking.ACTIVE_STATUSES),
+            'range_start': range_start,
+            'range_end': range_end,
+        })
+        columns = [column.name for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def daily_occupancy(first_day, last_day, resource_id=None):
+    """Booked minutes and bookings per resource and local day, read from the rollup."""
+    rows = ResourceDailyOccupancy.objects.filter(date__range=(first_day, last_day))
+    if resource_id is not None:
+        rows = rows.filter(resource_id=resource_id)
+    active = Q(status__in=Booking.ACTIVE_STATUSES)
+    # Aliases must not shadow the model fields: a later Sum('bookings') would
+    # resolve to the aggregate instead of the column.
+    rows = (
+        rows.values('resource_id', 'date')
+        .annotate(
+            minutes_total=Sum('booked_minutes', filter=active, default=0),
+            active_count=Sum('bookings', filter=active, default=0),
+            cancelled_count=Sum('bookings', filter=Q(status=Booking.STATUS_CANCELLED), default=0),
+        )
+        .order_by('resource_id', 'date')
+    )
+    return [
+        {
+            'resource_id': row['resource_id'],
+            'date': row['date'],
+            'booked_minutes': row['minutes_total'],
+            'bookings': row['active_count'],
+            'cancelled_bookings': row['cancelled_count'],
+        }
+        for row in rows
+    ]
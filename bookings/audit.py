@@ -0,0 +1,271 @@
+"""
+Audit log writer.
+
+With AUDIT_LOG_ASYNC enabled, request handlers only push events onto a Redis
+list once their transaction commits; bookings.tasks.flush_audit_log drains
+the list into AuditLog with bulk_create. Otherwise (tests, local runs) rows
+are inserted synchronously inside the caller's transaction.
+
+The table is range-partitioned by month on ts (migration 0005).
+maintain_partitions creates the upcoming months and archives expired ones,
+so retention is a partition drop instead of a DELETE over the whole history.
+"""
+import gzip
+import json
+import logging
+import os
+import uuid
+from datetime import date, datetime, timezone as dt_timezone
+
+import redis
+from django.conf import settings
+from django.db import DataError, IntegrityError, connection, transaction
+from django.utils import timezone
+
+from roomtime.metrics import InstrumentedRedis
+
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "audit:queue"
+DEAD_LETTER_KEY = "audit:dead_letter"
+FLUSH_LOCK_KEY = "audit:flush_lock"
+FLUSH_BATCH_SIZE = 500
+FLUSH_LOCK_SECONDS = 60
+
+r = InstrumentedRedis.from_url(settings.REDIS_URL, decode_responses=True)
+
+# Only the flusher holding the token may extend or release the lock.
+# KEYS[1] = lock, ARGV = token, ttl_ms (0 releases)
+_OWN_LOCK = r.register_script("""
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+if tonumber(ARGV[2]) == 0 then
+    return redis.call('DEL', KEYS[1])
+end
+return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+""")
+
+
+def event(actor_user, action, entity, entity_id, meta=None):
+    return {
+        "actor_user_id": getattr(actor_user, 'pk', actor_user),
+        "action": action,
+        "entity": entity,
+        "entity_id": entity_id,
+        "meta": meta or {},
+        "ts": timezone.now().isoformat(),
+    }
+
+
+def record(actor_user, action, entity, entity_id, meta=None):
+    record_many([event(actor_user, action, entity, entity_id, meta)])
+
+
+def record_many(events):
+    if not events:
+        return
+    if settings.AUDIT_LOG_ASYNC:
+        transaction.on_commit(lambda: _enqueue(events))
+    else:
+        AuditLog.objects.bulk_create([_to_row(e) for e in events])
+
+
+def _enqueue(events):
+    try:
+        r.rpush(QUEUE_KEY, *[json.dumps(e) for e in events])
+    except redis.RedisError:
+        # Losing audit rows is worse than a slow request.
+        logger.exception("Audit queue unavailable, writing %d events synchronously", len(events))
+        AuditLog.objects.bulk_create([_to_row(e) for e in events])
+
+
+def _to_row(e):
+    ts = e["ts"]
+    return AuditLog(
+        actor_user_id=e["actor_user_id"],
+        action=e["action"],
+        entity=e["entity"],
+        entity_id=e["entity_id"],
+        meta=e["meta"],
+        ts=datetime.fromisoformat(ts) if isinstance(ts, str) else ts,
+    )
+
+
+def flush(batch_size=FLUSH_BATCH_SIZE, max_batches=None):
+    """
+    Move queued events into AuditLog. Events are only trimmed from the list
+    after their batch is committed, so a crash replays a batch rather than
+    losing it. A lock keeps concurrent flushers from inserting twice; it is
+    re-checked and extended before every batch, so a flusher that outlived
+    its lock stops instead of racing the next one.
+    Events that can never be inserted go to DEAD_LETTER_KEY.
+    """
+    token = uuid.uuid4().hex
+    if not r.set(FLUSH_LOCK_KEY, token, nx=True, ex=FLUSH_LOCK_SECONDS):
+        return 0
+
+    written = 0
+    batches = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            if not _OWN_LOCK(keys=[FLUSH_LOCK_KEY], args=[token, FLUSH_LOCK_SECONDS * 1000]):
+                logger.warning("Audit flush lock expired, stopping after %d events", written)
+                break
+            raw = r.lrange(QUEUE_KEY, 0, batch_size - 1)
+            if not raw:
+                break
+            written += _write_batch(raw)
+            r.ltrim(QUEUE_KEY, len(raw), -1)
+            batches += 1
+    finally:
+        _OWN_LOCK(keys=[FLUSH_LOCK_KEY], args=[token, 0])
+    return written
+
+
+def _insert(rows):
+    with transaction.atomic(), connection.cursor() as cursor:
+        # The actor FK is deferred; check it now so a bad row fails here, not at commit.
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        AuditLog.objects.bulk_create(rows)
+
+
+def _write_batch(raw):
+    """Insert a batch; if it fails, row by row, dead-lettering the rows that fail. Returns rows written."""
+    try:
+        _insert([_to_row(json.loads(item)) for item in raw])
+        return len(raw)
+    except (IntegrityError, DataError, ValueError, KeyError):
+        logger.exception("Audit batch of %d events failed, retrying one by one", len(raw))
+
+    written = 0
+    dead = []
+    for item in raw:
+        try:
+            _insert([_to_row(json.loads(item))])
+            written += 1
+        except (IntegrityError, DataError, ValueError, KeyError):
+            dead.append(item)
+    if dead:
+        logger.error("Moved %d audit events to %s", len(dead), DEAD_LETTER_KEY)
+        r.rpush(DEAD_LETTER_KEY, *dead)
+    return written
+
+
+def _add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition_name(month):
+    return f"{AuditLog._meta.db_table}_{month:%Y%m}"
+
+
+def _partition_month(name):
+    suffix = name[len(AuditLog._meta.db_table) + 1:]
+    if len(suffix) != 6 or not suffix.isdigit():
+        return None  # the DEFAULT partition
+    return date(int(suffix[:4]), int(suffix[4:]), 1)
+
+
+def _bound(month):
+    return datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc).isoformat()
+
+
+def partitions():
+    """Monthly partitions currently attached to AuditLog, as {month: name}."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits"
+            " JOIN pg_class parent ON parent.oid = pg_inherits.inhparent"
+            " JOIN pg_class child ON child.oid = pg_inherits.inhrelid"
+            " WHERE parent.relname = %s",
+            [AuditLog._meta.db_table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    return {month: name for name in names if (month := _partition_month(name))}
+
+
+def create_partitions(first_month, last_month):
+    """Create the missing monthly partitions in [first_month, last_month]."""
+    existing = partitions()
+    created = []
+    month = first_month
+    while month <= last_month:
+        if month not in existing:
+            _create_partition(month)
+            created.append(_partition_name(month))
+        month = _add_months(month, 1)
+    return created
+
+
+def _create_partition(month):
+    """
+    Create one monthly partition. Rows of that month already in the DEFAULT
+    partition would make CREATE fail, so they are moved into the new one
+    while DEFAULT is detached.
+    """
+    qn = connection.ops.quote_name
+    table = qn(AuditLog._meta.db_table)
+    default = qn(f"{AuditLog._meta.db_table}_default")
+    bounds = [_bound(month), _bound(_add_months(month, 1))]
+    create = (
+        f"CREATE TABLE IF NOT EXISTS {qn(_partition_name(month))}"
+        f" PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)"
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE ts >= %s AND ts < %s)", bounds)
+        if not cursor.fetchone()[0]:
+            cursor.execute(create, bounds)
+            return
+        logger.warning("Moving audit rows of %s out of the DEFAULT partition", f"{month:%Y-%m}")
+        cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {default}")
+        cursor.execute(create, bounds)
+        cursor.execute(f"INSERT INTO {table} SELECT * FROM {default} WHERE ts >= %s AND ts < %s", bounds)
+        cursor.execute(f"DELETE FROM {default} WHERE ts >= %s AND ts < %s", bounds)
+        cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT")
+
+
+def archive_partition(month):
+    """
+    Dump one monthly partition to UPLOADS_ROOT/audit/<name>.csv.gz, then
+    detach and drop it. The file is written completely before anything is
+    detached, so a failure leaves the partition in place for the next run.
+    """
+    name = _partition_name(month)
+    qn = connection.ops.quote_name
+    directory = settings.UPLOADS_ROOT / 'audit'
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}.csv.gz"
+    partial = path.with_name(path.name + '.partial')
+
+    with gzip.open(partial, 'wb') as archive, connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {qn(name)} TO STDOUT WITH (FORMAT csv, HEADER)", archive)
+    os.replace(partial, path)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qn(AuditLog._meta.db_table)} DETACH PARTITION {qn(name)}")
+        cursor.execute(f"DROP TABLE {qn(name)}")
+    return path
+
+
+def maintain_partitions(months_ahead=None, retention_months=None):
+    """Create partitions ahead of time and archive those past retention."""
+    if months_ahead is None:
+        months_ahead = settings.AUDIT_LOG_PARTITIONS_AHEAD
+    if retention_months is None:
+        retention_months = settings.AUDIT_LOG_RETENTION_MONTHS
+
+    now = timezone.now().astimezone(dt_timezone.utc)
+    current = date(now.year, now.month, 1)
+    created = create_partitions(current, _add_months(current, months_ahead))
+
+    oldest_kept = _add_months(current, -retention_months)
+    archived = []
+    for month in sorted(partitions()):
+        if month < oldest_kept:
+            archived.append(archive_partition(month))
+            logger.info("Archived audit partition %s to %s", _partition_name(month), archived[-1])
+    return created, archived
@@ -0,0 +1,219 @@
+import bisect
+import time as _time
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from roomtime import conditional
+
+from .models import Booking
+
+MAX_RANGE_DAYS = 31
+DEFAULT_SLOT_MINUTES = 30
+
+CACHE_TIMEOUT = 60 * 60
+RECOMPUTE_LOCK_TIMEOUT = 10
+RECOMPUTE_WAIT_STEPS = 20
+RECOMPUTE_WAIT_SECONDS = 0.05
+
+
+def day_bounds(first_day, last_day=None):
+    """Aware [start, end) covering whole local days (settings.TIME_ZONE)."""
+    last_day = last_day or first_day
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(first_day, time.min), tz)
+    end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def busy_intervals(resource_id, start, end):
+    """Active bookings overlapping [start, end), ordered by start. One indexed query."""
+    return list(
+        Booking.objects.filter(
+            resource_id=resource_id,
+            starts_at__lt=end,
+            ends_at__gt=start,
+            status__in=Booking.ACTIVE_STATUSES,
+        )
+        .order_by('starts_at')
+        .values_list('starts_at', 'ends_at', 'status')
+    )
+
+
+def free_resources(resources, start, end):
+    """
+    Narrow a Room_Resources queryset to rooms with no active booking overlapping
+    [start, end). Single query: the overlap check is a correlated NOT EXISTS,
+    and the tightest capacity fit comes first.
+    """
+    overlapping = Booking.objects.filter(
+        resource=OuterRef('pk'),
+        starts_at__lt=end,
+        ends_at__gt=start,
+        status__in=Booking.ACTIVE_STATUSES,
+    )
+    return resources.filter(~Exists(overlapping)).order_by('capacity', 'id')
+
+
+def version_key(resource_id):
+    return f"availability:{resource_id}:version"
+
+
+def _day_key(resource_id, version, day):
+    return f"availability:{resource_id}:v{version}:{day.isoformat()}"
+
+
+def get_version(resource_id):
+    return conditional.read_versions(version_key(resource_id))[0][0]
+
+
+def bump_version(*resource_ids):
+    """Invalidate every cached day of the given resources."""
+    conditional.bump(*[version_key(resource_id) for resource_id in resource_ids])
+
+
+def bump_version_on_commit(*resource_ids):
+    transaction.on_commit(lambda: bump_version(*resource_ids))
+
+
+def cached_busy_intervals(resource_id, first_day, last_day):
+    """
+    Read-through variant of busy_intervals for whole local days. Every day is
+    cached separately under the resource's current version, so writers only
+    have to bump the version to invalidate.
+    """
+    version = get_version(resource_id)
+    days = [first_day + timedelta(days=n) for n in range((last_day - first_day).days + 1)]
+    keys = {day: _day_key(resource_id, version, day) for day in days}
+
+    found = cache.get_many(list(keys.values()))
+    missing = [day for day in days if keys[day] not in found]
+    if missing:
+        found.update(_recompute_days(resource_id, missing, keys))
+
+    intervals = set()
+    for day in days:
+        intervals.update(found[keys[day]])
+    return sorted(intervals)
+
+
+def _recompute_days(resource_id, days, keys):
+    # Single flight: one caller recomputes, concurrent callers wait for its
+    # result instead of sending the same query to the database.
+    lock_key = f"{keys[days[0]]}:lock"
+    if not cache.add(lock_key, 1, RECOMPUTE_LOCK_TIMEOUT):
+        wanted = [keys[day] for day in days]
+        for _ in range(RECOMPUTE_WAIT_STEPS):
+            _time.sleep(RECOMPUTE_WAIT_SECONDS)
+            found = cache.get_many(wanted)
+            if len(found) == len(wanted):
+                return found
+        return _bucket_by_day(resource_id, days, keys)
+
+    try:
+        computed = _bucket_by_day(resource_id, days, keys)
+        cache.set_many(computed, CACHE_TIMEOUT)
+        return computed
+    finally:
+        cache.delete(lock_key)
+
+
+def _bucket_by_day(resource_id, days, keys):
+    buckets = {}
+    bounds = []
+    for day in days:
+        buckets[keys[day]] = []
+        bounds.append((day_bounds(day), keys[day]))
+
+    window_start, window_end = day_bounds(min(days), max(days))
+    for interval in busy_intervals(resource_id, window_start, window_end):
+        for (day_start, day_end), key in bounds:
+            if interval[0] < day_end and interval[1] > day_start:
+                buckets[key].append(interval)
+    return buckets
+
+
+class IntervalSet:
+    """Sorted, non-overlapping [start, end) intervals with O(log n) overlap checks."""
+
+    def __init__(self, intervals=()):
+        self._starts = []
+        self._ends = []
+        for start, end in sorted(intervals):
+            self.add(start, end)
+
+    def overlaps(self, start, end):
+        pos = bisect.bisect_left(self._starts, end)
+        return pos > 0 and self._ends[pos - 1] > start
+
+    def add(self, start, end):
+        pos = bisect.bisect_left(self._starts, start)
+        self._starts.insert(pos, start)
+        self._ends.insert(pos, end)
+
+
+def overlapping(candidates, busy):
+    """
+    Indexes of candidates that overlap any busy interval. Both lists are sorted
+    by start and non-overlapping, so a single two-pointer merge is enough.
+    """
+    hits = []
+    j = 0
+    for i, (start, end) in enumerate(candidates):
+        while j < len(busy) and busy[j][1] <= start:
+            j += 1
+        if j < len(busy) and busy[j][0] < end:
+            hits.append(i)
+    return hits
+
+
+def merge_intervals(intervals):
+    """Sweep-line merge of (start, end, ...) tuples sorted by start."""
+    merged = []
+    for interval in intervals:
+        start, end = interval[0], interval[1]
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def free_intervals(busy, window_start, window_end, slot_minutes=DEFAULT_SLOT_MINUTES):
+    """
+    Gaps between merged busy intervals inside the window, snapped inwards to
+    the slot grid anchored at window_start. Gaps shorter than one slot are dropped.
+    """
+    slot = timedelta(minutes=slot_minutes)
+    free = []
+    cursor = window_start
+    for busy_start, busy_end in merge_intervals(busy) + [[window_end, window_end]]:
+        gap_start = max(cursor, window_start)
+        gap_end = min(busy_start, window_end)
+        if gap_end > gap_start:
+            gap_start = window_start + _ceil_div(gap_start - window_start, slot) * slot
+            gap_end = window_start + ((gap_end - window_start) // slot) * slot
+            if gap_end - gap_start >= slot:
+                free.append((gap_start, gap_end))
+        cursor = max(cursor, busy_end)
+        if cursor >= window_end:
+            break
+    return free
+
+
+def _ceil_div(delta, slot):
+    return -(-delta // slot)
+
+
+def format_intervals(intervals):
+    return [
+        {
+            "starts_at": timezone.localtime(start).isoformat(),
+            "ends_at": timezone.localtime(end).isoformat(),
+        }
+        for start, end in intervals
+    ]
@@ -0,0 +1,109 @@
+"""
+Bulk booking exports.
+
+Rows are streamed from a server-side cursor straight into a gzip file under
+UPLOADS_ROOT/exports, so memory stays flat however many bookings match. The
+finished file is recorded as a FileUpload owned by the requesting user.
+"""
+import csv
+import gzip
+import json
+import logging
+import os
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Booking, BookingExport, FileUpload
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+COLUMNS = ['id', 'user_email', 'resource_name', 'starts_at', 'ends_at', 'status', 'created_at']
+MIME = 'application/gzip'
+
+
+def export_queryset(export):
+    bookings = Booking.objects.all()
+    if not export.user.is_superuser:
+        bookings = bookings.filter(user=export.user)
+    if export.resource_id:
+        bookings = bookings.filter(resource_id=export.resource_id)
+    if export.date_from:
+        bookings = bookings.filter(starts_at__gte=export.date_from)
+    if export.date_to:
+        bookings = bookings.filter(starts_at__lt=export.date_to)
+    return bookings.order_by('id').values_list(
+        'id', 'user__email', 'resource__name', 'starts_at', 'ends_at', 'status', 'created_at'
+    )
+
+
+def export_path(export):
+    return settings.UPLOADS_ROOT / 'exports' / f"bookings-{export.pk}.{export.format}.gz"
+
+
+def _records(export, chunk_size):
+    for row in export_queryset(export).iterator(chunk_size=chunk_size):
+        yield [
+            timezone.localtime(value).isoformat() if hasattr(value, 'tzinfo') else value
+            for value in row
+        ]
+
+
+def _write_csv(out, records):
+    writer = csv.writer(out)
+    writer.writerow(COLUMNS)
+    rows = 0
+    for record in records:
+        writer.writerow(record)
+        rows += 1
+    return rows
+
+
+def _write_ndjson(out, records):
+    rows = 0
+    for record in records:
+        out.write(json.dumps(dict(zip(COLUMNS, record)), ensure_ascii=False))
+        out.write('\n')
+        rows += 1
+    return rows
+
+
+WRITERS = {
+    BookingExport.FORMAT_CSV: _write_csv,
+    BookingExport.FORMAT_NDJSON: _write_ndjson,
+}
+
+
+def run(export, chunk_size=CHUNK_SIZE):
+    """Write the export file and record it. Failures are stored on the export."""
+    export.status = BookingExport.STATUS_RUNNING
+    export.save(update_fields=['status'])
+
+    path = export_path(export)
+    partial = path.with_name(path.name + '.partial')
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(partial, 'wt', encoding='utf-8', newline='') as out:
+            rows = WRITERS[export.format](out, _records(export, chunk_size))
+        os.replace(partial, path)
+    except Exception as exc:
+        logger.exception("Booking export %s failed", export.pk)
+        partial.unlink(missing_ok=True)
+        export.status = BookingExport.STATUS_FAILED
+        export.error = str(exc)
+        export.finished_at = timezone.now()
+        export.save(update_fields=['status', 'error', 'finished_at'])
+        return export
+
+    export.file = FileUpload.objects.create(
+        owner_user=export.user,
+        path=str(path.relative_to(settings.UPLOADS_ROOT)),
+        size_bytes=path.stat().st_size,
+        mime=MIME,
+    )
+    export.rows = rows
+    export.status = BookingExport.STATUS_DONE
+    export.finished_at = timezone.now()
+    export.save(update_fields=['file', 'rows', 'status', 'finished_at'])
+    return export
@@ -0,0 +1,51 @@
+"""
+Trigram search for list endpoints.
+
+SearchFilter compiles every search field to an unindexable ILIKE '%term%'
+join. TrigramSearchFilter matches search_fields with pg_trgm word similarity
+instead: each related field becomes an id subquery served by that table's
+gin_trgm_ops index, and rows are annotated with a `relevance` score.
+"""
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Q
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.functions import Greatest
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+RELEVANCE = 'relevance'
+
+
+class TrigramSearchFilter(filters.SearchFilter):
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        term = ' '.join(self.get_search_terms(request))
+        if not search_fields or not term:
+            return queryset
+
+        matches = Q()
+        scores = []
+        for path in search_fields:
+            matches |= self.match(queryset.model, path, term)
+            scores.append(TrigramWordSimilarity(term, path))
+        relevance = Greatest(*scores) if len(scores) > 1 else scores[0]
+        return queryset.filter(matches).annotate(**{RELEVANCE: relevance})
+
+    def match(self, model, path, term):
+        relation, _, field = path.partition(LOOKUP_SEP)
+        if not field:
+            return Q(**{f'{relation}__trigram_word_similar': term})
+        related = model._meta.get_field(relation).related_model
+        ids = related._default_manager.filter(**{f'{field}__trigram_word_similar': term}).values('pk')
+        return Q(**{f'{relation}__in': ids})
+
+
+class RelevanceOrderingFilter(filters.OrderingFilter):
+    """OrderingFilter that only accepts `relevance` when there is a search term to rank by."""
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        fields = super().remove_invalid_fields(queryset, fields, view, request)
+        if request.query_params.get(api_settings.SEARCH_PARAM, '').strip():
+            return fields
+        return [term for term in fields if term.lstrip('-') != RELEVANCE]
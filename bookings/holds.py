@@ -0,0 +1,147 @@
+"""
+Short-lived slot holds kept in Redis while a user is still filling in the
+checkout form, and the expiry schedule of pending bookings.
+
+A hold is a `hold:{token}` key (SET NX PX, so it expires by itself) plus a
+member of the per-resource sorted set `holds:{resource_id}`, scored by the
+start of the held interval. Placing a hold is a single Lua script, so the
+overlap check and the reservation are atomic without touching Postgres locks.
+"""
+import json
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+
+from roomtime.metrics import InstrumentedRedis
+
+from .models import Booking
+
+r = InstrumentedRedis.from_url(settings.REDIS_URL, decode_responses=True)
+
+PENDING_EXPIRY_KEY = "pending_expiry"
+
+# KEYS[1] = holds:{resource_id}, KEYS[2] = hold:{token}
+# ARGV = start_ms, end_ms, member, payload, ttl_ms, now_ms
+_PLACE_HOLD = r.register_script("""
+local start_ms = tonumber(ARGV[1])
+local end_ms = tonumber(ARGV[2])
+local now_ms = tonumber(ARGV[6])
+for _, member in ipairs(redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', '(' .. end_ms)) do
+    local _, _, _, held_end, expires = string.match(member, '^(%w+):(%d+):(%d+):(%d+):(%d+)$')
+    if tonumber(expires) <= now_ms then
+        redis.call('ZREM', KEYS[1], member)
+    elseif tonumber(held_end) > start_ms then
+        return 0
+    end
+end
+if not redis.call('SET', KEYS[2], ARGV[4], 'NX', 'PX', ARGV[5]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], start_ms, ARGV[3])
+if redis.call('PTTL', KEYS[1]) < tonumber(ARGV[5]) then
+    redis.call('PEXPIRE', KEYS[1], ARGV[5])
+end
+return 1
+""")
+
+
+class HoldConflict(Exception):
+    pass
+
+
+def _resource_key(resource_id):
+    return f"holds:{resource_id}"
+
+
+def _hold_key(token):
+    return f"hold:{token}"
+
+
+def _ms(moment):
+    return int(moment.timestamp() * 1000)
+
+
+def _from_ms(value):
+    return datetime.fromtimestamp(int(value) / 1000, tz=dt_timezone.utc)
+
+
+def _parse(member):
+    token, user_id, start_ms, end_ms, expires_ms = member.split(':')
+    return token, int(user_id), int(start_ms), int(end_ms), int(expires_ms)
+
+
+def place_hold(user, resource_id, start, end, ttl_seconds=None):
+    """Reserve [start, end) for user. Returns the hold; raises HoldConflict."""
+    ttl_ms = (ttl_seconds or settings.BOOKING_HOLD_TTL_SECONDS) * 1000
+    now_ms = int(time.time() * 1000)
+    token = uuid.uuid4().hex
+    hold = {
+        "token": token,
+        "user_id": user.id,
+        "resource_id": resource_id,
+        "starts_at": start.isoformat(),
+        "ends_at": end.isoformat(),
+        "expires_at": _from_ms(now_ms + ttl_ms).isoformat(),
+    }
+    hold["member"] = f"{token}:{user.id}:{_ms(start)}:{_ms(end)}:{now_ms + ttl_ms}"
+
+    placed = _PLACE_HOLD(
+        keys=[_resource_key(resource_id), _hold_key(token)],
+        args=[_ms(start), _ms(end), hold["member"], json.dumps(hold), ttl_ms, now_ms],
+    )
+    if not placed:
+        raise HoldConflict()
+    return hold
+
+
+def get_hold(token):
+    payload = r.get(_hold_key(token))
+    return json.loads(payload) if payload else None
+
+
+def release_hold(hold):
+    pipe = r.pipeline(transaction=True)
+    pipe.zrem(_resource_key(hold["resource_id"]), hold["member"])
+    pipe.delete(_hold_key(hold["token"]))
+    pipe.execute()
+
+
+def active_holds(resource_id, start, end, exclude_user_id=None):
+    """Live holds overlapping [start, end) as (start, end, user_id), one round trip."""
+    now_ms = int(time.time() * 1000)
+    start_ms, end_ms = _ms(start), _ms(end)
+    found = []
+    for member in r.zrangebyscore(_resource_key(resource_id), '-inf', f'({end_ms}'):
+        _, user_id, held_start, held_end, expires_ms = _parse(member)
+        if expires_ms > now_ms and held_end > start_ms and user_id != exclude_user_id:
+            found.append((_from_ms(held_start), _from_ms(held_end), user_id))
+    return found
+
+
+def schedule_expiry(bookings):
+    """Register pending bookings in the expiry sorted set, scored by expiry time."""
+    expires = time.time() + settings.BOOKING_PENDING_TTL_MINUTES * 60
+    pending = {str(b.id): expires for b in bookings if b.status == Booking.STATUS_PENDING}
+    if pending:
+        r.zadd(PENDING_EXPIRY_KEY, pending)
+
+
+def schedule_expiry_on_commit(bookings):
+    transaction.on_commit(lambda: schedule_expiry(bookings))
+
+
+def due_for_expiry(limit):
+    return [int(booking_id) for booking_id in r.zrangebyscore(
+        PENDING_EXPIRY_KEY, '-inf', time.time(), start=0, num=limit
+    )]
+
+
+def forget_expired(booking_ids):
+    """Drop drained ids from the schedule and their booking locks, one round trip."""
+    pipe = r.pipeline(transaction=False)
+    pipe.zrem(PENDING_EXPIRY_KEY, *booking_ids)
+    pipe.delete(*[f"booking_lock:{booking_id}" for booking_id in booking_ids])
+    pipe.execute()
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from bookings import occupancy
+
+
+class Command(BaseCommand):
+    help = "Regenerate the Redis occupancy bitmaps from the Booking table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days-back', type=int, default=1)
+        parser.add_argument('--days-ahead', type=int, default=180)
+        parser.add_argument(
+            '--resource', type=int, action='append', dest='resources',
+            help="Only rebuild this resource (can be repeated)."
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        first_day = today - timedelta(days=options['days_back'])
+        last_day = today + timedelta(days=options['days_ahead'])
+
+        written = occupancy.rebuild_all(first_day, last_day, resource_ids=options['resources'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt occupancy for {first_day}..{last_day}: {written} non-empty day bitmaps"
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from bookings import rollup
+
+
+class Command(BaseCommand):
+    help = "Re-aggregate ResourceDailyOccupancy from the Booking table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help="Empty and rebuild the whole rollup instead of only the days touched since the last watermark."
+        )
+
+    def handle(self, *args, **options):
+        touched = rollup.repair(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f"Re-aggregated {touched} resource days"))
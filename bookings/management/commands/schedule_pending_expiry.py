@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from bookings import holds
+from bookings.models import Booking
+
+
+class Command(BaseCommand):
+    help = "Register existing pending bookings in the hold expiry schedule (one-off backfill)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        pending = Booking.objects.filter(status=Booking.STATUS_PENDING).only('id', 'status')
+        batch = []
+        total = 0
+        for booking in pending.iterator(chunk_size=options['batch_size']):
+            batch.append(booking)
+            if len(batch) == options['batch_size']:
+                holds.schedule_expiry(batch)
+                total += len(batch)
+                batch = []
+        holds.schedule_expiry(batch)
+        total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Scheduled expiry for {total} pending bookings"))
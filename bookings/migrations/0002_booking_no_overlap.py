@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:26
+
+import bookings.models
+import django.contrib.postgres.constraints
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.conf import settings
+from django.db import migrations, models
+
+# Bookings that slipped through the old racy pre-check would block the
+# constraint. Which one of an overlapping pair to keep is a business
+# decision, so the migration lists them and stops instead of cancelling any.
+OVERLAPPING_SQL = """
+SELECT b.id FROM bookings_booking AS b
+WHERE b.status IN ('pending', 'confirmed')
+  AND EXISTS (
+      SELECT 1 FROM bookings_booking AS o
+      WHERE o.resource_id = b.resource_id
+        AND o.status IN ('pending', 'confirmed')
+        AND o.id < b.id
+        AND o.starts_at < b.ends_at
+        AND o.ends_at > b.starts_at
+  )
+ORDER BY b.id
+"""
+
+
+def check_no_overlaps(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(OVERLAPPING_SQL)
+        ids = [row[0] for row in cursor.fetchall()]
+    if ids:
+        raise RuntimeError(
+            f"Cannot add booking_no_overlap: {len(ids)} active bookings overlap an earlier "
+            f"booking of the same resource (ids: {', '.join(map(str, ids))}). "
+            "Cancel or move them, then run migrate again."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+        ('rooms', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.RunPython(check_no_overlaps, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('status__in', ['pending', 'confirmed'])), expressions=[('resource', '='), (bookings.models.TsTzRange('starts_at', 'ends_at'), '&&')], name='booking_no_overlap'),
+        ),
+    ]
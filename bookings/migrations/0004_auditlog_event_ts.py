@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:33
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_booking_series'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='ts',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,106 @@
+from django.db import migrations, models
+
+
+# Rebuild bookings_auditlog as a table range-partitioned by month on ts.
+# Monthly partitions are created from the oldest existing row up to three
+# months ahead; bookings.audit.maintain_partitions keeps adding them later.
+# The primary key has to include the partition key, so it becomes (id, ts);
+# Django keeps treating id as the primary key, which stays unique because it
+# is fed from a single sequence.
+PARTITION_AUDITLOG = """
+CREATE TABLE bookings_auditlog_partitioned (
+    id bigint NOT NULL,
+    action varchar(255) NOT NULL,
+    entity varchar(100) NOT NULL,
+    entity_id integer NOT NULL,
+    meta jsonb NOT NULL,
+    ts timestamp with time zone NOT NULL,
+    actor_user_id bigint NOT NULL
+) PARTITION BY RANGE (ts);
+
+CREATE TABLE bookings_auditlog_default PARTITION OF bookings_auditlog_partitioned DEFAULT;
+
+DO $$
+DECLARE
+    month timestamptz;
+BEGIN
+    FOR month IN
+        SELECT generate_series(
+            date_trunc('month', COALESCE((SELECT min(ts) FROM bookings_auditlog), now()) AT TIME ZONE 'UTC'),
+            date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months',
+            interval '1 month'
+        ) AT TIME ZONE 'UTC'
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF bookings_auditlog_partitioned FOR VALUES FROM (%L) TO (%L)',
+            'bookings_auditlog_' || to_char(month AT TIME ZONE 'UTC', 'YYYYMM'),
+            month,
+            month + interval '1 month'
+        );
+    END LOOP;
+END $$;
+
+INSERT INTO bookings_auditlog_partitioned (id, action, entity, entity_id, meta, ts, actor_user_id)
+SELECT id, action, entity, entity_id, meta, ts, actor_user_id FROM bookings_auditlog;
+
+DROP TABLE bookings_auditlog;
+ALTER TABLE bookings_auditlog_partitioned RENAME TO bookings_auditlog;
+
+CREATE SEQUENCE bookings_auditlog_id_seq OWNED BY bookings_auditlog.id;
+ALTER TABLE bookings_auditlog ALTER COLUMN id SET DEFAULT nextval('bookings_auditlog_id_seq');
+SELECT setval('bookings_auditlog_id_seq', COALESCE((SELECT max(id) FROM bookings_auditlog), 0) + 1, false);
+
+ALTER TABLE bookings_auditlog ADD CONSTRAINT bookings_auditlog_pkey PRIMARY KEY (id, ts);
+ALTER TABLE bookings_auditlog
+    ADD CONSTRAINT bookings_auditlog_actor_user_id_d6333ecb_fk_users_user_id
+    FOREIGN KEY (actor_user_id) REFERENCES users_user (id) DEFERRABLE INITIALLY DEFERRED;
+CREATE INDEX bookings_auditlog_actor_user_id_d6333ecb ON bookings_auditlog (actor_user_id);
+"""
+
+# Back to a plain table with an identity id; dropping the partitioned table
+# drops its partitions and sequence.
+UNPARTITION_AUDITLOG = """
+CREATE TABLE bookings_auditlog_plain (
+    id bigint GENERATED BY DEFAULT AS IDENTITY NOT NULL,
+    action varchar(255) NOT NULL,
+    entity varchar(100) NOT NULL,
+    entity_id integer NOT NULL,
+    meta jsonb NOT NULL,
+    ts timestamp with time zone NOT NULL,
+    actor_user_id bigint NOT NULL
+);
+
+INSERT INTO bookings_auditlog_plain (id, action, entity, entity_id, meta, ts, actor_user_id)
+SELECT id, action, entity, entity_id, meta, ts, actor_user_id FROM bookings_auditlog;
+SELECT setval(
+    pg_get_serial_sequence('bookings_auditlog_plain', 'id'),
+    COALESCE((SELECT max(id) FROM bookings_auditlog_plain), 0) + 1,
+    false
+);
+
+DROP TABLE bookings_auditlog;
+ALTER TABLE bookings_auditlog_plain RENAME TO bookings_auditlog;
+ALTER SEQUENCE bookings_auditlog_plain_id_seq RENAME TO bookings_auditlog_id_seq;
+
+ALTER TABLE bookings_auditlog ADD CONSTRAINT bookings_auditlog_pkey PRIMARY KEY (id);
+ALTER TABLE bookings_auditlog
+    ADD CONSTRAINT bookings_auditlog_actor_user_id_d6333ecb_fk_users_user_id
+    FOREIGN KEY (actor_user_id) REFERENCES users_user (id) DEFERRABLE INITIALLY DEFERRED;
+CREATE INDEX bookings_auditlog_actor_user_id_d6333ecb ON bookings_auditlog (actor_user_id);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_auditlog_event_ts'),
+        ('users', '0002_passwordresettoken'),
+    ]
+
+    operations = [
+        migrations.RunSQL(PARTITION_AUDITLOG, reverse_sql=UNPARTITION_AUDITLOG),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['entity', 'entity_id', 'ts'], name='auditlog_entity_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:37
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Built concurrently: the bookings table is too large to lock for writes.
+    atomic = False
+
+    dependencies = [
+        ('bookings', '0005_partition_auditlog'),
+        ('rooms', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='booking',
+            index=models.Index(fields=['starts_at', 'id'], name='bookings_bo_starts__47563f_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='booking',
+            index=models.Index(fields=['ends_at', 'id'], name='bookings_bo_ends_at_961bc6_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='booking',
+            index=models.Index(fields=['created_at', 'id'], name='bookings_bo_created_b97bfb_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:39
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # The partial index is built before the old one is dropped, so overlap
+    # and availability queries are never left without an index.
+    atomic = False
+
+    dependencies = [
+        ('bookings', '0006_booking_keyset_indexes'),
+        ('rooms', '0002_trigram_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'confirmed'])), fields=['resource', 'ends_at'], include=('starts_at', 'status'), name='booking_active_resource_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='booking',
+            name='bookings_bo_resourc_16b817_idx',
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('bookings', '0008_booking_export'),
+        ('rooms', '0002_trigram_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceDailyOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled')], max_length=10)),
+                ('booked_minutes', models.IntegerField(default=0)),
+                ('bookings', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        AddIndexConcurrently(
+            model_name='booking',
+            index=models.Index(fields=['updated_at'], name='bookings_bo_updated_e5c31b_idx'),
+        ),
+        migrations.AddField(
+            model_name='resourcedailyoccupancy',
+            name='resource',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_occupancy', to='rooms.room_resources'),
+        ),
+        migrations.AddIndex(
+            model_name='resourcedailyoccupancy',
+            index=models.Index(fields=['date', 'resource'], name='bookings_re_date_480384_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='resourcedailyoccupancy',
+            constraint=models.UniqueConstraint(fields=('resource', 'date', 'status'), name='daily_occupancy_unique'),
+        ),
+    ]
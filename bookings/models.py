@@ -1,8 +1,45 @@
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeOperators
 from django.db import models
+from django.utils import timezone
 from users.models import User
 from rooms.models import Room_Resources
 
 
+BOOKING_OVERLAP_CONSTRAINT = 'booking_no_overlap'
+
+
+class TsTzRange(models.Func):
+    function = 'TSTZRANGE'
+    output_field = DateTimeRangeField()
+
+
+class BookingSeries(models.Model):
+    FREQUENCY_DAILY = 'daily'
+    FREQUENCY_WEEKLY = 'weekly'
+
+    FREQUENCY_CHOICES = [
+        (FREQUENCY_DAILY, 'Daily'),
+        (FREQUENCY_WEEKLY, 'Weekly'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='booking_series')
+    resource = models.ForeignKey(Room_Resources, on_delete=models.CASCADE, related_name='booking_series')
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES)
+    interval = models.PositiveSmallIntegerField(default=1)
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    until = models.DateField(null=True, blank=True)
+    count = models.PositiveSmallIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.frequency} series #{self.pk} for resource {self.resource_id}"
+
+
 class Booking(models.Model):
     STATUS_PENDING = 'pending'
     STATUS_CONFIRMED = 'confirmed'
@@ -13,34 +50,132 @@ class Booking(models.Model):
         (STATUS_CONFIRMED, 'Confirmed'),
         (STATUS_CANCELLED, 'Cancelled'),
     ]
+    ACTIVE_STATUSES = (STATUS_PENDING, STATUS_CONFIRMED)
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookings')
     resource = models.ForeignKey(Room_Resources, on_delete=models.CASCADE, related_name='bookings')
+    series = models.ForeignKey(
+        BookingSeries, on_delete=models.SET_NULL, null=True, blank=True, related_name='bookings'
+    )
     starts_at = models.DateTimeField()
     ends_at = models.DateTimeField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bulk .update() and raw UPDATE statements have to set this explicitly;
+    # bookings.rollup.repair re-aggregates the days of rows changed since its watermark.
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         indexes = [
             models.Index(fields=['user', 'created_at']),
-            models.Index(fields=['resource', 'starts_at', 'ends_at']), 
+            models.Index(fields=['updated_at']),
+            # Overlap and availability lookups only ever read active bookings,
+            # so cancelled history stays out of the index. Keyed on ends_at so
+            # `ends_at > window start` skips past bookings; starts_at and status
+            # are included for index-only scans of busy intervals.
+            models.Index(
+                fields=['resource', 'ends_at'],
+                include=['starts_at', 'status'],
+                condition=models.Q(status__in=['pending', 'confirmed']),
+                name='booking_active_resource_idx',
+            ),
+            # Keyset pagination of the bookings list (bookings.pagination).
+            models.Index(fields=['starts_at', 'id']),
+            models.Index(fields=['ends_at', 'id']),
+            models.Index(fields=['created_at', 'id']),
+        ]
+        constraints = [
+            ExclusionConstraint(
+                name=BOOKING_OVERLAP_CONSTRAINT,
+                expressions=[
+                    ('resource', RangeOperators.EQUAL),
+                    (TsTzRange('starts_at', 'ends_at'), RangeOperators.OVERLAPS),
+                ],
+                condition=models.Q(status__in=['pending', 'confirmed']),
+            ),
         ]
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"Booking by {self.user.email} for {self.resource.name} ({self.status})"    
+        # ids only: str() runs in admin lists and log lines, where following the
+        # foreign keys would cost a query per booking
+        return f"Booking #{self.pk} by user {self.user_id} for resource {self.resource_id} ({self.status})"
     
 
+class ResourceDailyOccupancy(models.Model):
+    """
+    Booked minutes and booking count per resource, local day and status.
+    Minutes are split across the days a booking spans; a booking is counted
+    on the day it starts. Maintained by bookings.rollup.
+    """
+    resource = models.ForeignKey(Room_Resources, on_delete=models.CASCADE, related_name='daily_occupancy')
+    date = models.DateField()
+    status = models.CharField(max_length=10, choices=Booking.STATUS_CHOICES)
+    booked_minutes = models.IntegerField(default=0)
+    bookings = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['resource', 'date', 'status'], name='daily_occupancy_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'resource']),
+        ]
+
+    def __str__(self):
+        return f"{self.resource_id} {self.date} {self.status}: {self.booked_minutes} min"
+
+
 class FileUpload(models.Model):
     owner_user = models.ForeignKey(User, on_delete=models.CASCADE)
     path = models.CharField(max_length=255)
-    size_bytes = models.PositiveIntegerField()
+    size_bytes = models.PositiveBigIntegerField()
     mime = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
-        return f"FileUpload by {self.owner_user.email} - {self.path}"
+        return f"FileUpload by user {self.owner_user_id} - {self.path}"
+
+
+class BookingExport(models.Model):
+    FORMAT_CSV = 'csv'
+    FORMAT_NDJSON = 'ndjson'
+
+    FORMAT_CHOICES = [
+        (FORMAT_CSV, 'CSV'),
+        (FORMAT_NDJSON, 'NDJSON'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='booking_exports')
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default=FORMAT_CSV)
+    date_from = models.DateTimeField(null=True, blank=True)
+    date_to = models.DateTimeField(null=True, blank=True)
+    resource = models.ForeignKey(Room_Resources, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    rows = models.PositiveIntegerField(default=0)
+    file = models.ForeignKey('FileUpload', on_delete=models.SET_NULL, null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.format} export #{self.pk} ({self.status})"
 
 
 class AuditLog(models.Model):
@@ -49,7 +184,14 @@ class AuditLog(models.Model):
     entity = models.CharField(max_length=100)
     entity_id = models.IntegerField()
     meta = models.JSONField(default=dict)
-    ts = models.DateTimeField(auto_now_add=True)
-    
+    ts = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        # The table is range-partitioned by month on ts (migration 0005,
+        # maintained by bookings.audit.maintain_partitions).
+        indexes = [
+            models.Index(fields=['entity', 'entity_id', 'ts'], name='auditlog_entity_ts_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.actor_user.email} - {self.action} ({self.entity})"
\ No newline at end of file
+        return f"user {self.actor_user_id} - {self.action} ({self.entity} #{self.entity_id})"
\ No newline at end of file
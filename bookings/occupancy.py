@@ -0,0 +1,219 @@
+"""
+Redis bitmap occupancy index.
+
+One bitmap per resource and local day, one bit per SLOT_MINUTES slot. A bit is
+set when any active booking touches the slot, so the index is conservative at
+slot granularity: it can answer "is this slot-aligned window free?" exactly
+with BITCOUNT, without a Postgres range scan.
+"""
+from datetime import timedelta
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from rooms.models import Room_Resources
+from roomtime.metrics import InstrumentedRedis
+
+from .availability import busy_intervals, day_bounds
+from .models import Booking
+
+SLOT_MINUTES = 15
+SLOT = timedelta(minutes=SLOT_MINUTES)
+RETENTION = timedelta(days=2)
+REBUILD_RETRIES = 5
+
+r = InstrumentedRedis.from_url(settings.REDIS_URL)
+
+
+def _key(resource_id, day):
+    return f"occupancy:{resource_id}:{day:%Y%m%d}"
+
+
+def _spans(start, end):
+    """Yield (day, first_slot, last_slot) for every local day [start, end) touches."""
+    day = timezone.localtime(start).date()
+    while True:
+        day_start, day_end = day_bounds(day)
+        if day_start >= end:
+            return
+        first = (max(start, day_start) - day_start) // SLOT
+        last = -(-(min(end, day_end) - day_start) // SLOT) - 1
+        yield day, first, last
+        day += timedelta(days=1)
+
+
+def _expire_at(day):
+    return day_bounds(day)[1] + RETENTION
+
+
+def is_aligned(start, end):
+    return all(
+        moment.second == 0 and moment.microsecond == 0
+        and timezone.localtime(moment).minute % SLOT_MINUTES == 0
+        for moment in (start, end)
+    )
+
+
+def can_answer(start, end):
+    """The index is only authoritative for slot-aligned windows, and only once enabled."""
+    return settings.OCCUPANCY_INDEX_ENABLED and is_aligned(start, end)
+
+
+def mark(bookings):
+    """Set the slots of freshly created bookings. MULTI/EXEC, so all or nothing."""
+    pipe = r.pipeline(transaction=True)
+    for resource_id, start, end in bookings:
+        for day, first, last in _spans(start, end):
+            key = _key(resource_id, day)
+            for slot in range(first, last + 1):
+                pipe.setbit(key, slot, 1)
+            pipe.expireat(key, _expire_at(day))
+    pipe.execute()
+
+
+def rebuild(resource_id, start, end):
+    """
+    Recompute the bitmaps of the days touched by [start, end) from Postgres.
+    Used when slots may have to be cleared: another booking can share a slot
+    with the one that went away, so bits can't simply be unset.
+    """
+    rebuild_days({resource_id: {day for day, _, _ in _spans(start, end)}})
+
+
+def rebuild_days(days_by_resource):
+    """
+    Recompute the bitmaps of {resource_id: days}: one busy_intervals query
+    and one WATCH/MULTI per resource, however many intervals led to it.
+    """
+    for resource_id, days in days_by_resource.items():
+        _rebuild_resource(resource_id, sorted(days))
+
+
+def _rebuild_resource(resource_id, days):
+    keys = [_key(resource_id, day) for day in days]
+    window_start, window_end = day_bounds(days[0], days[-1])
+
+    with r.pipeline(transaction=True) as pipe:
+        for _ in range(REBUILD_RETRIES):
+            try:
+                # A concurrent mark() lands after its own commit, so if it
+                # touches our keys the EXEC fails and the re-read sees it.
+                pipe.watch(*keys)
+                bitmaps = _bitmaps({resource_id: set(days)}, [
+                    (resource_id, busy_start, busy_end)
+                    for busy_start, busy_end, _ in busy_intervals(resource_id, window_start, window_end)
+                ])
+                pipe.multi()
+                _write(pipe, resource_id, days, bitmaps)
+                pipe.execute()
+                return
+            except redis.WatchError:
+                continue
+        # Still contended after all retries: leave it to rebuild_occupancy.
+
+
+def mark_on_commit(bookings):
+    bookings = [(b.resource_id, b.starts_at, b.ends_at) for b in bookings]
+    transaction.on_commit(lambda: mark(bookings))
+
+
+def rebuild_on_commit(resource_id, start, end):
+    transaction.on_commit(lambda: rebuild(resource_id, start, end))
+
+
+def rebuild_many_on_commit(intervals):
+    """rebuild_on_commit for (resource_id, start, end) intervals, each resource day rebuilt once."""
+    days_by_resource = {}
+    for resource_id, start, end in intervals:
+        days_by_resource.setdefault(resource_id, set()).update(day for day, _, _ in _spans(start, end))
+    if days_by_resource:
+        transaction.on_commit(lambda: rebuild_days(days_by_resource))
+
+
+def _bitmaps(wanted, rows):
+    """Bitmaps keyed by (resource_id, day) from (resource_id, start, end) rows."""
+    bitmaps = {}
+    for resource_id, start, end in rows:
+        days = wanted.get(resource_id, ())
+        for day, first, last in _spans(start, end):
+            if day not in days:
+                continue
+            bitmap = bitmaps.setdefault((resource_id, day), bytearray(_bitmap_size(day)))
+            for slot in range(first, last + 1):
+                bitmap[slot >> 3] |= 0x80 >> (slot & 7)
+    return bitmaps
+
+
+def _bitmap_size(day):
+    day_start, day_end = day_bounds(day)
+    return -(-((day_end - day_start) // SLOT) // 8)
+
+
+def _write(pipe, resource_id, days, bitmaps):
+    for day in days:
+        key = _key(resource_id, day)
+        bitmap = bitmaps.get((resource_id, day))
+        if bitmap is None:
+            pipe.delete(key)
+        else:
+            pipe.set(key, bytes(bitmap))
+            pipe.expireat(key, _expire_at(day))
+
+
+def busy_slot_counts(resource_ids, start, end):
+    """Number of occupied slots in [start, end) per resource, one pipelined round trip."""
+    spans = list(_spans(start, end))
+    pipe = r.pipeline(transaction=False)
+    for resource_id in resource_ids:
+        for day, first, last in spans:
+            pipe.bitcount(_key(resource_id, day), first, last, mode='BIT')
+    results = iter(pipe.execute())
+    return {
+        resource_id: sum(next(results) for _ in spans)
+        for resource_id in resource_ids
+    }
+
+
+def is_free(resource_id, start, end):
+    return busy_slot_counts([resource_id], start, end)[resource_id] == 0
+
+
+def free_resources(resources, start, end):
+    """Bitmap counterpart of availability.free_resources; returns a list."""
+    candidates = list(resources.order_by('capacity', 'id'))
+    counts = busy_slot_counts([resource.id for resource in candidates], start, end)
+    return [resource for resource in candidates if counts[resource.id] == 0]
+
+
+def rebuild_all(first_day, last_day, resource_ids=None, batch_size=500):
+    """Regenerate the index for [first_day, last_day] from the Booking table."""
+    days = [first_day + timedelta(days=n) for n in range((last_day - first_day).days + 1)]
+    window_start, window_end = day_bounds(first_day, last_day)
+
+    bookings = Booking.objects.filter(
+        starts_at__lt=window_end,
+        ends_at__gt=window_start,
+        status__in=Booking.ACTIVE_STATUSES,
+    )
+    if resource_ids is not None:
+        bookings = bookings.filter(resource_id__in=resource_ids)
+    else:
+        resource_ids = list(Room_Resources.objects.values_list('id', flat=True))
+
+    wanted = {resource_id: set(days) for resource_id in resource_ids}
+    bitmaps = _bitmaps(
+        wanted,
+        bookings.values_list('resource_id', 'starts_at', 'ends_at').iterator(chunk_size=2000),
+    )
+
+    written = 0
+    pipe = r.pipeline(transaction=False)
+    for index, resource_id in enumerate(resource_ids, start=1):
+        _write(pipe, resource_id, days, bitmaps)
+        written += sum(1 for day in days if (resource_id, day) in bitmaps)
+        if index % batch_size == 0:
+            pipe.execute()
+    pipe.execute()
+    return written
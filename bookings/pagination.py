@@ -0,0 +1,142 @@
+"""
+Keyset pagination for the bookings lists.
+
+Pages are addressed by an opaque cursor holding the (field, id) of the last
+row seen (field is a datetime, or the float search relevance), so every
+page is an index range scan of page_size + 1 rows no matter how deep it is,
+and no COUNT(*) is issued.
+"""
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(queryset)
+        cursor = self.decode_cursor(request)
+
+        reverse = cursor is not None and cursor['reverse']
+        # Walking backwards flips the order; the page is flipped back below.
+        descending = self.descending != reverse
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(f'{prefix}{self.field}', f'{prefix}id')
+        if cursor is not None:
+            queryset = queryset.filter(self.after(cursor['value'], cursor['id'], descending))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_row = rows[-1] if rows and (has_more or reverse) else None
+        self.previous_row = rows[0] if rows and cursor is not None and (has_more or not reverse) else None
+        return rows
+
+    def after(self, value, pk, descending):
+        """Rows strictly past (value, pk) in the given direction."""
+        if descending:
+            return Q(**{f'{self.field}__lte': value}) & (Q(**{f'{self.field}__lt': value}) | Q(id__lt=pk))
+        return Q(**{f'{self.field}__gte': value}) & (Q(**{f'{self.field}__gt': value}) | Q(id__gt=pk))
+
+    def get_ordering(self, queryset):
+        # OrderingFilter has already run, so the effective ordering is on the
+        # queryset; only its first term is used, with id as the tie-breaker.
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        term = ordering[0] if ordering else '-id'
+        return term.lstrip('-'), term.startswith('-')
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            field, value, pk, reverse = cursor['f'], cursor['v'], int(cursor['i']), bool(cursor['r'])
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if field != self.field:
+            # A cursor from a differently ordered listing points nowhere sensible.
+            raise NotFound(self.invalid_cursor_message)
+        value = parse_datetime(value) if isinstance(value, str) else value
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return {'value': value, 'id': pk, 'reverse': reverse}
+
+    def encode_cursor(self, row, reverse):
+        value = row[self.field] if isinstance(row, dict) else getattr(row, self.field)
+        pk = row['id'] if isinstance(row, dict) else row.pk
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        payload = {'f': self.field, 'v': value, 'i': pk, 'r': int(reverse)}
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if self.next_row is None:
+            return None
+        return self.encode_cursor(self.next_row, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_row is None:
+            return None
+        return self.encode_cursor(self.previous_row, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque cursor returned in next/previous.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Number of results per page (max {self.max_page_size}).',
+                'schema': {'type': 'integer'},
+            },
+        ]
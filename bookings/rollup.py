@@ -0,0 +1,162 @@
+"""
+Incrementally maintained ResourceDailyOccupancy rollup.
+
+Writers apply signed deltas inside their own transaction: a created booking
+adds its minutes (split per local day) and a count on its start day, a
+cancellation moves them from the old status to cancelled. Deltas are a
+single INSERT ... ON CONFLICT DO UPDATE, so concurrent writers add up
+instead of overwriting each other.
+
+repair() is the safety net: it re-aggregates, from Booking, only the
+(resource, day) pairs of bookings whose updated_at is past its watermark.
+The beat schedule also runs repair(full=True) nightly, which rebuilds the
+whole table and catches what the incremental pass cannot see.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .availability import day_bounds
+from .models import Booking, ResourceDailyOccupancy
+
+WATERMARK_KEY = "occupancy_rollup:watermark"
+# Transactions stamp updated_at before they commit; re-reading a few minutes
+# of overlap makes sure a slow commit is never skipped.
+WATERMARK_LAG = timedelta(minutes=5)
+
+
+def rows(bookings):
+    return [(b.resource_id, b.starts_at, b.ends_at, b.status) for b in bookings]
+
+
+def _day_minutes(start, end):
+    """(local day, whole minutes of [start, end) on that day) for every day touched."""
+    day = timezone.localtime(start).date()
+    while True:
+        day_start, day_end = day_bounds(day)
+        if day_start >= end:
+            return
+        yield day, int((min(end, day_end) - max(start, day_start)).total_seconds() // 60)
+        day += timedelta(days=1)
+
+
+def _deltas(deltas, booking_rows, sign):
+    for resource_id, start, end, status in booking_rows:
+        first_day = timezone.localtime(start).date()
+        for day, minutes in _day_minutes(start, end):
+            entry = deltas.setdefault((resource_id, day, status), [0, 0])
+            entry[0] += sign * minutes
+            if day == first_day:
+                entry[1] += sign
+    return deltas
+
+
+def apply(added=(), removed=()):
+    """Add the (resource_id, starts_at, ends_at, status) rows in added, subtract removed."""
+    deltas = _deltas(_deltas({}, added, 1), removed, -1)
+    # Sorted, so concurrent writers lock rollup rows in the same order.
+    values = [
+        (resource_id, day, status, minutes, count)
+        for (resource_id, day, status), (minutes, count) in sorted(deltas.items())
+        if minutes or count
+    ]
+    if not values:
+        return
+
+    table = ResourceDailyOccupancy._meta.db_table
+    placeholders = ', '.join(['(%s, %s, %s, %s, %s, now())'] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (resource_id, date, status, booked_minutes, bookings, updated_at)
+            VALUES {placeholders}
+            ON CONFLICT (resource_id, date, status) DO UPDATE SET
+                booked_minutes = {table}.booked_minutes + EXCLUDED.booked_minutes,
+                bookings = {table}.bookings + EXCLUDED.bookings,
+                updated_at = EXCLUDED.updated_at
+            """,
+            [value for row in values for value in row],
+        )
+
+
+def record(bookings):
+    apply(added=rows(bookings))
+
+
+def move(booking_rows, status):
+    """Move (resource_id, starts_at, ends_at, old_status) rows to status."""
+    booking_rows = list(booking_rows)
+    apply(
+        added=[(resource_id, start, end, status) for resource_id, start, end, _ in booking_rows],
+        removed=booking_rows,
+    )
+
+
+TOUCHED_SQL = """
+CREATE TEMP TABLE rollup_touched ON COMMIT DROP AS
+SELECT DISTINCT b.resource_id, day::date AS date
+FROM {booking} b,
+     generate_series(
+         (b.starts_at AT TIME ZONE %(tz)s)::date,
+         ((b.ends_at - interval '1 microsecond') AT TIME ZONE %(tz)s)::date,
+         interval '1 day'
+     ) AS day
+WHERE %(since)s::timestamptz IS NULL OR b.updated_at > %(since)s
+"""
+
+CLEAR_SQL = """
+DELETE FROM {rollup} r USING rollup_touched t
+WHERE r.resource_id = t.resource_id AND r.date = t.date
+"""
+
+CLEAR_ALL_SQL = "DELETE FROM {rollup}"
+
+AGGREGATE_SQL = """
+INSERT INTO {rollup} (resource_id, date, status, booked_minutes, bookings, updated_at)
+SELECT t.resource_id, t.date, b.status,
+       SUM(FLOOR(EXTRACT(EPOCH FROM
+           LEAST(b.ends_at, (t.date + 1)::timestamp AT TIME ZONE %(tz)s)
+           - GREATEST(b.starts_at, t.date::timestamp AT TIME ZONE %(tz)s)
+       ) / 60))::int,
+       COUNT(*) FILTER (WHERE (b.starts_at AT TIME ZONE %(tz)s)::date = t.date),
+       now()
+FROM rollup_touched t
+JOIN {booking} b
+  ON b.resource_id = t.resource_id
+ AND b.starts_at < (t.date + 1)::timestamp AT TIME ZONE %(tz)s
+ AND b.ends_at > t.date::timestamp AT TIME ZONE %(tz)s
+GROUP BY 1, 2, 3
+"""
+
+
+def repair(full=False):
+    """
+    Recompute the rollup rows of every (resource, day) touched by a booking
+    changed since the last watermark. With full=True (or on the first run)
+    the whole table is emptied and rebuilt. Returns the number of
+    (resource, day) pairs rebuilt.
+
+    The incremental pass only sees where bookings are now: if a write skipped
+    the deltas, the days a booking was moved away from keep their old totals,
+    and deleted bookings (e.g. by a cascade from their user) leave nothing to
+    find at all. Only full=True fixes those.
+    """
+    started = timezone.now()
+    since = None if full else cache.get(WATERMARK_KEY)
+    names = {'booking': Booking._meta.db_table, 'rollup': ResourceDailyOccupancy._meta.db_table}
+    params = {'tz': settings.TIME_ZONE, 'since': since}
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # ON COMMIT DROP doesn't fire when running inside an outer transaction.
+        cursor.execute("DROP TABLE IF EXISTS rollup_touched")
+        cursor.execute(TOUCHED_SQL.format(**names), params)
+        cursor.execute("SELECT count(*) FROM rollup_touched")
+        touched = cursor.fetchone()[0]
+        cursor.execute((CLEAR_ALL_SQL if since is None else CLEAR_SQL).format(**names))
+        cursor.execute(AGGREGATE_SQL.format(**names), params)
+
+    cache.set(WATERMARK_KEY, started - WATERMARK_LAG, timeout=None)
+    return touched
@@ -0,0 +1,298 @@
+"""
+Production-scale synthetic data (manage.py seed_roomtime).
+
+Rows come from a random.Random seeded with --seed and are streamed into
+Postgres with COPY FROM STDIN, CSV_CHUNK_ROWS at a time. While loading, the
+secondary indexes and all non-primary-key constraints of the seeded tables
+are dropped and rebuilt afterwards in one pass each, which also re-validates
+the booking exclusion constraint. Everything runs in one transaction, so a
+failed seed leaves the database as it was.
+
+Every resource's bookings are laid out on a fixed grid: booking i lies
+inside window i of the span, so active bookings never overlap and the data
+depends only on the arguments, not on when the command runs.
+"""
+import csv
+import io
+import json
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from rooms.models import Room_Resources
+from rooms.services.room_resources import CATALOG_VERSION_KEY
+from roomtime import conditional
+from users.models import RefreshToken, User
+
+from . import audit, availability
+from .availability import day_bounds
+from .models import AuditLog, Booking
+
+CSV_CHUNK_ROWS = 50_000
+NULL = r'\N'
+SLOT = timedelta(minutes=15)
+# Deferred constraint types in restore order: foreign keys last (they need the referenced keys).
+CONSTRAINT_ORDER = {'u': 0, 'x': 1, 'c': 2, 'f': 3}
+
+
+@dataclass
+class Plan:
+    users: int
+    resources: int
+    bookings: int
+    start: date
+    days: int
+    days_ahead: int
+    audit_ratio: float
+    tokens_per_user: int
+    password: str
+    seed: int
+
+    @property
+    def span_start(self):
+        return day_bounds(self.start - timedelta(days=self.days - self.days_ahead))[0]
+
+    @property
+    def anchor(self):
+        # "Now" of the generated data: midnight of --start.
+        return day_bounds(self.start)[0]
+
+    def window_slots(self):
+        per_resource = -(-self.bookings // max(self.resources, 1))
+        return timedelta(days=self.days) // (SLOT * per_resource) if per_resource else 0
+
+
+def _next_id(model):
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {connection.ops.quote_name(model._meta.db_table)}")
+        return cursor.fetchone()[0]
+
+
+def _csv_value(value):
+    if value is None:
+        return NULL
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return json.dumps(value, separators=(',', ':'))
+    return value
+
+
+def copy_rows(model, fields, rows):
+    """COPY rows (tuples in fields order) into model's table. Returns the row count."""
+    qn = connection.ops.quote_name
+    columns = ', '.join(qn(model._meta.get_field(name).column) for name in fields)
+    sql = f"COPY {qn(model._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{NULL}')"
+
+    count = 0
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    with connection.cursor() as cursor:
+        for row in rows:
+            writer.writerow([_csv_value(value) for value in row])
+            count += 1
+            if count % CSV_CHUNK_ROWS == 0:
+                buffer.seek(0)
+                cursor.copy_expert(sql, buffer)
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+    return count
+
+
+def deferred_ddl(models):
+    """
+    (drop, create) statement lists for the secondary indexes and the unique,
+    exclusion, check and foreign-key constraints of the models' tables.
+    Primary keys and NOT NULL (contype 'n' since PostgreSQL 18) stay.
+    """
+    qn = connection.ops.quote_name
+    drops, indexes, constraints = [], [], []
+    with connection.cursor() as cursor:
+        for model in models:
+            table = model._meta.db_table
+            cursor.execute(
+                "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint"
+                " WHERE conrelid = %s::regclass AND contype IN %s",
+                [table, tuple(CONSTRAINT_ORDER)],
+            )
+            for name, kind, definition in cursor.fetchall():
+                drops.append(f"ALTER TABLE {qn(table)} DROP CONSTRAINT {qn(name)}")
+                constraints.append((CONSTRAINT_ORDER[kind], f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}"))
+            cursor.execute(
+                "SELECT i.relname, pg_get_indexdef(x.indexrelid) FROM pg_index x"
+                " JOIN pg_class i ON i.oid = x.indexrelid"
+                " WHERE x.indrelid = %s::regclass"
+                " AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)",
+                [table],
+            )
+            for name, definition in cursor.fetchall():
+                drops.append(f"DROP INDEX {qn(name)}")
+                # Partitioned parents report "ON ONLY"; recreate on every partition.
+                indexes.append(definition.replace(' ON ONLY ', ' ON '))
+    # Constraints go first: dropping a constraint drops its backing index.
+    drops.sort(key=lambda statement: not statement.startswith('ALTER'))
+    return drops, indexes + [statement for _, statement in sorted(constraints, key=lambda item: item[0])]
+
+
+def _users(plan, first_id):
+    # Fixed salt: the same --seed gives the same rows, hash included.
+    hashed = make_password(plan.password, salt=f'roomtimeseed{plan.seed}')
+    rng = random.Random(f'{plan.seed}:users')
+    for offset in range(plan.users):
+        user_id = first_id + offset
+        joined = plan.anchor - timedelta(days=rng.randrange(plan.days + 1), seconds=rng.randrange(86400))
+        admin = offset == 0
+        yield (
+            user_id, hashed, None, admin, f'seed{user_id}', '', '', f'seed{user_id}@example.com',
+            admin, True, joined, 'admin' if admin else 'user', joined,
+        )
+
+
+def _resources(plan, first_id):
+    rng = random.Random(f'{plan.seed}:resources')
+    for offset in range(plan.resources):
+        resource_id = first_id + offset
+        yield (
+            resource_id, f'Room {resource_id}', f'Building {rng.randrange(1, 9)}, floor {rng.randrange(1, 25)}',
+            rng.choice((2, 4, 6, 8, 10, 12, 20, 40, 100)), None, rng.random() < 0.95,
+        )
+
+
+def _bookings(plan, first_id, user_ids, resource_ids):
+    """
+    (id, user_id, resource_id, starts_at, ends_at, status, created_at, updated_at),
+    roughly in starts_at order. Deterministic, so audit rows can replay it.
+    """
+    rng = random.Random(f'{plan.seed}:bookings')
+    window = plan.window_slots()
+    span_start = plan.span_start
+    booking_id = first_id
+    remaining = plan.bookings
+    index = 0
+    while remaining > 0:
+        window_start = span_start + SLOT * (window * index)
+        for resource_id in resource_ids:
+            if remaining == 0:
+                break
+            length = rng.randint(2, min(12, window))
+            starts_at = window_start + SLOT * rng.randint(0, window - length)
+            ends_at = starts_at + SLOT * length
+            created_at = min(starts_at - timedelta(minutes=rng.randrange(60, 30 * 24 * 60)), plan.anchor)
+            cancelled = rng.random() < (0.15 if starts_at < plan.anchor else 0.1)
+            updated_at = created_at + timedelta(minutes=rng.randrange(1, 600)) if cancelled else created_at
+            yield (
+                booking_id, rng.choice(user_ids), resource_id, starts_at, ends_at,
+                Booking.STATUS_CANCELLED if cancelled else Booking.STATUS_CONFIRMED,
+                created_at, min(updated_at, plan.anchor),
+            )
+            booking_id += 1
+            remaining -= 1
+        index += 1
+
+
+def _audit_rows(plan, first_id, bookings):
+    rng = random.Random(f'{plan.seed}:audit')
+    audit_id = first_id
+    for booking_id, user_id, _, starts_at, ends_at, status, created_at, updated_at in bookings:
+        if rng.random() >= plan.audit_ratio:
+            continue
+        yield (audit_id, user_id, 'create_booking', 'Booking', booking_id,
+               {'starts_at': starts_at.isoformat(), 'ends_at': ends_at.isoformat()}, created_at)
+        audit_id += 1
+        if status == Booking.STATUS_CANCELLED:
+            yield (audit_id, user_id, 'cancel_booking', 'Booking', booking_id, {'status': status}, updated_at)
+            audit_id += 1
+
+
+def _refresh_tokens(plan, first_id, user_ids):
+    rng = random.Random(f'{plan.seed}:tokens')
+    token_id = first_id
+    for user_id in user_ids:
+        for _ in range(plan.tokens_per_user):
+            expires_at = plan.anchor + timedelta(days=rng.randrange(-30, 30))
+            yield (token_id, user_id, f'{rng.getrandbits(128):032x}', expires_at, rng.random() < 0.3)
+            token_id += 1
+
+
+BOOKING_FIELDS = ['id', 'user', 'resource', 'starts_at', 'ends_at', 'status', 'created_at', 'updated_at']
+MODELS = [User, Room_Resources, Booking, AuditLog, RefreshToken]
+
+
+def seed(plan, log=print):
+    """Load the plan's rows. Returns {table: rows}."""
+    if plan.bookings and plan.window_slots() < 2:
+        raise ValueError("Too many bookings per resource for the span: increase --days or --resources")
+
+    counts = {}
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL synchronous_commit = off")
+            cursor.execute("SET LOCAL maintenance_work_mem = '512MB'")
+
+        drops, creates = deferred_ddl(MODELS)
+        with connection.cursor() as cursor:
+            for statement in drops:
+                cursor.execute(statement)
+        log(f"Deferred {len(creates)} indexes and constraints")
+
+        first_user = _next_id(User)
+        first_resource = _next_id(Room_Resources)
+        first_booking = _next_id(Booking)
+        user_ids = list(range(first_user, first_user + plan.users))
+        resource_ids = list(range(first_resource, first_resource + plan.resources))
+
+        counts[User._meta.db_table] = copy_rows(User, [
+            'id', 'password', 'last_login', 'is_superuser', 'username', 'first_name', 'last_name',
+            'email', 'is_staff', 'is_active', 'date_joined', 'role', 'created_at',
+        ], _users(plan, first_user))
+        counts[Room_Resources._meta.db_table] = copy_rows(Room_Resources, [
+            'id', 'name', 'location', 'capacity', 'file_path', 'is_active',
+        ], _resources(plan, first_resource))
+        log(f"Copied {plan.users} users and {plan.resources} resources")
+
+        counts[Booking._meta.db_table] = copy_rows(
+            Booking, BOOKING_FIELDS, _bookings(plan, first_booking, user_ids, resource_ids)
+        )
+        log(f"Copied {counts[Booking._meta.db_table]} bookings")
+
+        if plan.audit_ratio > 0 and plan.bookings:
+            earliest = plan.span_start - timedelta(days=30)
+            audit.create_partitions(earliest.date().replace(day=1), plan.anchor.date().replace(day=1))
+            counts[AuditLog._meta.db_table] = copy_rows(AuditLog, [
+                'id', 'actor_user', 'action', 'entity', 'entity_id', 'meta', 'ts',
+            ], _audit_rows(plan, _next_id(AuditLog), _bookings(plan, first_booking, user_ids, resource_ids)))
+            log(f"Copied {counts[AuditLog._meta.db_table]} audit log rows")
+
+        counts[RefreshToken._meta.db_table] = copy_rows(RefreshToken, [
+            'id', 'user', 'token', 'expires_at', 'revoked',
+        ], _refresh_tokens(plan, _next_id(RefreshToken), user_ids))
+
+        with connection.cursor() as cursor:
+            for statement in creates:
+                cursor.execute(statement)
+            log(f"Rebuilt {len(creates)} indexes and constraints")
+            for statement in connection.ops.sequence_reset_sql(no_style(), MODELS):
+                cursor.execute(statement)
+            for model in MODELS:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+
+    # Cached catalog pages and availability days may describe reused ids.
+    conditional.bump(
+        CATALOG_VERSION_KEY, *[availability.version_key(resource_id) for resource_id in resource_ids]
+    )
+    return counts
+
+
+def flush():
+    """Empty every table the seed writes to (and, by cascade, their dependants)."""
+    qn = connection.ops.quote_name
+    tables = ', '.join(qn(model._meta.db_table) for model in MODELS)
+    with connection.cursor() as cursor:
+        cursor.execute(f"TRUNCATE {tables} RESTART IDENTITY CASCADE")
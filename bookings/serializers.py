@@ -1,6 +1,11 @@
+from datetime import timedelta
+
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Booking
-from .services import create_booking
+from rest_framework.reverse import reverse
+from rooms.models import Room_Resources
+from .models import Booking, BookingExport, BookingSeries
+from .services import create_booking, update_booking, MAX_SERIES_OCCURRENCES
 
 class BookingSerializer(serializers.ModelSerializer):
 
@@ -21,17 +26,110 @@ class BookingSerializer(serializers.ModelSerializer):
         if start >= end:
             raise serializers.ValidationError("Время окончания должно быть позже времени начала.")
 
-        overlap = Booking.objects.filter(
-            resource=resource,
-            starts_at__lt=end,
-            ends_at__gt=start
-        ).exclude(pk=getattr(self.instance, 'pk', None)).exists()
-
-        if overlap:
-            raise serializers.ValidationError("Ресурс уже забронирован в этот интервал времени.")
-
         return data
 
     def create(self, validated_data):
         user = self.context['request'].user
         return create_booking(user, validated_data)
+
+    def update(self, instance, validated_data):
+        return update_booking(instance, validated_data)
+
+
+class BulkBookingItemSerializer(serializers.Serializer):
+    resource = serializers.IntegerField(min_value=1)
+    starts_at = serializers.DateTimeField()
+    ends_at = serializers.DateTimeField()
+    status = serializers.ChoiceField(
+        choices=[Booking.STATUS_PENDING, Booking.STATUS_CONFIRMED],
+        default=Booking.STATUS_PENDING
+    )
+
+    def validate(self, data):
+        if data['starts_at'] >= data['ends_at']:
+            raise serializers.ValidationError("Время окончания должно быть позже времени начала.")
+        return data
+
+
+class BulkBookingSerializer(serializers.Serializer):
+    MAX_ITEMS = 500
+
+    bookings = serializers.ListField(
+        child=serializers.DictField(), allow_empty=False, max_length=MAX_ITEMS
+    )
+    all_or_nothing = serializers.BooleanField(default=True)
+
+
+class BookingSeriesSerializer(serializers.ModelSerializer):
+    skip_conflicts = serializers.BooleanField(default=False, write_only=True)
+
+    class Meta:
+        model = BookingSeries
+        fields = [
+            'id', 'user', 'resource', 'frequency', 'interval', 'starts_at', 'ends_at',
+            'until', 'count', 'created_at', 'skip_conflicts'
+        ]
+        read_only_fields = ['id', 'user', 'created_at']
+
+    def validate(self, data):
+        start = data['starts_at']
+        end = data['ends_at']
+        interval = data.get('interval', 1)
+        until = data.get('until')
+        count = data.get('count')
+
+        if start >= end:
+            raise serializers.ValidationError("Время окончания должно быть позже времени начала.")
+        if interval < 1:
+            raise serializers.ValidationError("Поле 'interval' должно быть не меньше 1.")
+        if (until is None) == (count is None):
+            raise serializers.ValidationError("Укажите ровно одно из полей 'until' или 'count'.")
+        if count is not None and not 1 <= count <= MAX_SERIES_OCCURRENCES:
+            raise serializers.ValidationError(f"Поле 'count' должно быть от 1 до {MAX_SERIES_OCCURRENCES}.")
+        if until is not None and until < timezone.localtime(start).date():
+            raise serializers.ValidationError("Дата 'until' не может быть раньше начала серии.")
+
+        period_days = interval * (7 if data['frequency'] == BookingSeries.FREQUENCY_WEEKLY else 1)
+        if end - start > timedelta(days=period_days):
+            raise serializers.ValidationError("Длительность бронирования не может превышать период повторения.")
+        if until is not None and (until - timezone.localtime(start).date()).days // period_days >= MAX_SERIES_OCCURRENCES:
+            raise serializers.ValidationError(
+                f"До даты 'until' получается больше {MAX_SERIES_OCCURRENCES} повторов."
+            )
+
+        return data
+
+
+class HoldSerializer(serializers.Serializer):
+    resource = serializers.PrimaryKeyRelatedField(queryset=Room_Resources.objects.filter(is_active=True))
+    starts_at = serializers.DateTimeField()
+    ends_at = serializers.DateTimeField()
+
+    def validate(self, data):
+        if data['starts_at'] >= data['ends_at']:
+            raise serializers.ValidationError("Время окончания должно быть позже времени начала.")
+        return data
+
+
+class BookingExportSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BookingExport
+        fields = [
+            'id', 'format', 'date_from', 'date_to', 'resource', 'status', 'rows',
+            'error', 'created_at', 'finished_at', 'download_url'
+        ]
+        read_only_fields = ['id', 'status', 'rows', 'error', 'created_at', 'finished_at']
+
+    def validate(self, data):
+        date_from = data.get('date_from')
+        date_to = data.get('date_to')
+        if date_from and date_to and date_from >= date_to:
+            raise serializers.ValidationError("Дата окончания должна быть позже даты начала.")
+        return data
+
+    def get_download_url(self, export):
+        if export.status != BookingExport.STATUS_DONE:
+            return None
+        return reverse('booking-exports-download', kwargs={'pk': export.pk}, request=self.context.get('request'))
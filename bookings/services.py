@@ -1,66 +1,334 @@
-from django.db import transaction
+from contextlib import contextmanager
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
 from rest_framework import serializers
-from .models import Booking, AuditLog
-from celery import shared_task
+from rooms.models import Room_Resources
+from .models import Booking, BookingSeries, BOOKING_OVERLAP_CONSTRAINT
+from . import audit, availability, holds, occupancy, rollup
 from django.utils import timezone
-from django.conf import settings
-from datetime import timedelta
+from datetime import datetime, timedelta
+
+OVERLAP_ERROR = "Ресурс уже забронирован в этот интервал времени."
+HELD_ERROR = "Интервал временно удерживается другим пользователем."
+MAX_SERIES_OCCURRENCES = 200
+
+
+@contextmanager
+def overlap_guard():
+    """Turn a violation of the booking overlap constraint into a 400 error."""
+    try:
+        yield
+    except IntegrityError as exc:
+        diag = getattr(exc.__cause__, 'diag', None)
+        if getattr(diag, 'constraint_name', None) == BOOKING_OVERLAP_CONSTRAINT:
+            raise serializers.ValidationError(OVERLAP_ERROR)
+        raise
 
-from django.core.cache import cache
-import redis
 
 @transaction.atomic
 def create_booking(user, validated_data):
-    resource = validated_data['resource']
     start = validated_data['starts_at']
     end = validated_data['ends_at']
 
-    if Booking.objects.select_for_update().filter(
-        resource=resource,
-        starts_at__lt=end,
-        ends_at__gt=start
-    ).exists():
-        raise serializers.ValidationError("Этот ресурс уже занят в выбранное время")
+    if holds.active_holds(validated_data['resource'].id, start, end, exclude_user_id=user.id):
+        raise serializers.ValidationError(HELD_ERROR)
 
     validated_data['user'] = user
-    booking = Booking.objects.create(**validated_data)
-
-    AuditLog.objects.create(
-        actor_user=user,
-        action='create_booking',
-        entity='Booking',
-        entity_id=booking.id,
-        meta={'starts_at': start.isoformat(), 'ends_at': end.isoformat()}
+    # The exclusion constraint is the single source of truth for overlaps,
+    # so there is no pre-check query and no row lock to wait on.
+    with overlap_guard():
+        booking = Booking.objects.create(**validated_data)
+    rollup.record([booking])
+    availability.bump_version_on_commit(booking.resource_id)
+    occupancy.mark_on_commit([booking])
+    holds.schedule_expiry_on_commit([booking])
+
+    audit.record(
+        user,
+        'create_booking',
+        'Booking',
+        booking.id,
+        {'starts_at': start.isoformat(), 'ends_at': end.isoformat()}
     )
 
     return booking
 
-HOLD_TTL_MINUTES = 0
-r = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
 
-@shared_task
-def release_holds():
+def existing_intervals(spans):
+    """
+    Active bookings per resource for {resource_id: (start, end)} spans, sorted
+    by start. One query: one index range scan per resource.
+    """
+    intervals = {resource_id: [] for resource_id in spans}
+    if not spans:
+        return intervals
+    rows = Booking.objects.filter(
+        reduce(or_, (
+            Q(resource_id=resource_id, starts_at__lt=end, ends_at__gt=start)
+            for resource_id, (start, end) in spans.items()
+        )),
+        status__in=Booking.ACTIVE_STATUSES,
+    ).order_by('resource_id', 'starts_at').values_list('resource_id', 'starts_at', 'ends_at')
+    for resource_id, start, end in rows:
+        intervals[resource_id].append((start, end))
+    return intervals
+
+
+def _audit_created(user, bookings):
+    audit.record_many([
+        audit.event(
+            user,
+            'create_booking',
+            'Booking',
+            booking.id,
+            {'starts_at': booking.starts_at.isoformat(), 'ends_at': booking.ends_at.isoformat()}
+        )
+        for booking in bookings
+    ])
+
+
+def create_bookings_bulk(user, items, all_or_nothing=True):
+    """
+    Create many bookings at once. items is a list of (index, validated_data).
+    Conflicts with existing bookings and inside the batch are found with one
+    query, other users' holds with one Redis lookup per resource; bookings
+    and audit rows are written with bulk_create.
+    Returns (created, errors), errors being [{"index": ..., "errors": [...]}].
+    """
+    resources = Room_Resources.objects.in_bulk({data['resource'] for _, data in items})
+
+    spans = {}
+    for _, data in items:
+        if data['resource'] in resources:
+            start, end = spans.get(data['resource'], (data['starts_at'], data['ends_at']))
+            spans[data['resource']] = (min(start, data['starts_at']), max(end, data['ends_at']))
+    taken = {
+        resource_id: availability.IntervalSet(intervals)
+        for resource_id, intervals in existing_intervals(spans).items()
+    }
+    # Live holds never overlap each other, so one lookup per resource is enough.
+    held = {
+        resource_id: availability.IntervalSet(
+            hold[:2] for hold in holds.active_holds(resource_id, start, end, exclude_user_id=user.id)
+        )
+        for resource_id, (start, end) in spans.items()
+    }
+    accepted = {resource_id: availability.IntervalSet() for resource_id in spans}
+
+    to_create = []
+    errors = []
+    for index, data in items:
+        resource_id, start, end = data['resource'], data['starts_at'], data['ends_at']
+        if resource_id not in resources:
+            errors.append({"index": index, "errors": ["Ресурс не найден."]})
+        elif taken[resource_id].overlaps(start, end):
+            errors.append({"index": index, "errors": [OVERLAP_ERROR]})
+        elif held[resource_id].overlaps(start, end):
+            errors.append({"index": index, "errors": [HELD_ERROR]})
+        elif accepted[resource_id].overlaps(start, end):
+            errors.append({"index": index, "errors": ["Пересекается с другим бронированием в этом запросе."]})
+        else:
+            accepted[resource_id].add(start, end)
+            to_create.append(Booking(
+                user=user,
+                resource_id=resource_id,
+                starts_at=start,
+                ends_at=end,
+                status=data.get('status', Booking.STATUS_PENDING),
+            ))
+
+    if not to_create or (errors and all_or_nothing):
+        return [], errors
+
+    with transaction.atomic(), overlap_guard():
+        created = Booking.objects.bulk_create(to_create)
+        rollup.record(created)
+        _audit_created(user, created)
+        availability.bump_version_on_commit(*{booking.resource_id for booking in created})
+        occupancy.mark_on_commit(created)
+        holds.schedule_expiry_on_commit(created)
+
+    return created, errors
+
+
+def expand_occurrences(starts_at, ends_at, frequency, interval=1, until=None, count=None):
+    """
+    (start, end) of every occurrence, sorted. Steps are taken in local wall-clock
+    time so a weekly 10:00 meeting stays at 10:00 across UTC offset changes.
+    """
+    step = timedelta(days=interval * (7 if frequency == BookingSeries.FREQUENCY_WEEKLY else 1))
+    first = timezone.make_naive(starts_at)
+    duration = ends_at - starts_at
+    limit = min(count or MAX_SERIES_OCCURRENCES, MAX_SERIES_OCCURRENCES)
+
+    occurrences = []
+    local_start = first
+    while len(occurrences) < limit and (until is None or local_start.date() <= until):
+        start = timezone.make_aware(local_start)
+        occurrences.append((start, start + duration))
+        local_start += step
+    return occurrences
+
+
+def create_series(user, validated_data, skip_conflicts=False):
+    """
+    Create a series and all its occurrences. Occurrences are matched against the
+    resource's existing bookings (fetched with one query) and other users'
+    holds by a sorted merge.
+    Returns (series, bookings); raises ValidationError listing conflicting
+    occurrences unless skip_conflicts is set.
+    """
+    resource = validated_data['resource']
+    occurrences = expand_occurrences(
+        validated_data['starts_at'],
+        validated_data['ends_at'],
+        validated_data['frequency'],
+        validated_data.get('interval', 1),
+        validated_data.get('until'),
+        validated_data.get('count'),
+    )
+
+    span = (occurrences[0][0], occurrences[-1][1])
+    existing = existing_intervals({resource.id: span})[resource.id]
+    held = [hold[:2] for hold in holds.active_holds(resource.id, *span, exclude_user_id=user.id)]
+    busy = availability.merge_intervals(sorted(existing + held))
+    conflicts = set(availability.overlapping(occurrences, busy))
+    # Skipping every occurrence would leave an empty series.
+    if conflicts and (not skip_conflicts or len(conflicts) == len(occurrences)):
+        as_drf = serializers.DateTimeField()
+        raise serializers.ValidationError({
+            "conflicts": [as_drf.to_representation(occurrences[i][0]) for i in sorted(conflicts)]
+        })
+
+    with transaction.atomic(), overlap_guard():
+        series = BookingSeries.objects.create(user=user, **validated_data)
+        bookings = Booking.objects.bulk_create([
+            Booking(
+                user=user,
+                resource=resource,
+                series=series,
+                starts_at=start,
+                ends_at=end,
+                status=Booking.STATUS_CONFIRMED,
+            )
+            for i, (start, end) in enumerate(occurrences)
+            if i not in conflicts
+        ])
+        rollup.record(bookings)
+        _audit_created(user, bookings)
+        availability.bump_version_on_commit(resource.id)
+        occupancy.mark_on_commit(bookings)
+
+    return series, bookings
+
+
+def _cancel_where(condition, params):
+    """
+    Cancel the bookings matching condition (SQL over the booking table) with a
+    single UPDATE ... RETURNING, keeping the rollup in step. Returns
+    (id, resource_id, starts_at, ends_at, previous_status) per cancelled row.
+    """
+    table = Booking._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {table} AS b
+            SET status = %s, updated_at = %s
+            FROM (SELECT id, status FROM {table} WHERE {condition} FOR UPDATE) AS previous
+            WHERE b.id = previous.id
+            RETURNING b.id, b.resource_id, b.starts_at, b.ends_at, previous.status
+            """,
+            [Booking.STATUS_CANCELLED, timezone.now(), *params],
+        )
+        cancelled = cursor.fetchall()
+    rollup.move([row[1:] for row in cancelled], Booking.STATUS_CANCELLED)
+    return cancelled
+
+
+@transaction.atomic
+def cancel_series(series, actor):
+    """Cancel every occurrence that has not started yet with a single UPDATE."""
     now = timezone.now()
-    ttl = now - timedelta(minutes=HOLD_TTL_MINUTES)
+    cancelled = len(_cancel_where(
+        "series_id = %s AND status = ANY(%s) AND starts_at >= %s",
+        [series.id, list(Booking.ACTIVE_STATUSES), now],
+    ))
+
+    if cancelled:
+        last_end = expand_occurrences(
+            series.starts_at, series.ends_at, series.frequency,
+            series.interval, series.until, series.count,
+        )[-1][1]
+        availability.bump_version_on_commit(series.resource_id)
+        occupancy.rebuild_on_commit(series.resource_id, max(now, series.starts_at), last_end)
+
+    audit.record(actor, 'cancel_series', 'BookingSeries', series.id, {'cancelled': cancelled})
+    return cancelled
+
 
-    expired = Booking.objects.filter(
-        status=Booking.STATUS_PENDING,
-        created_at__lt=ttl
+def confirm_hold(user, hold, resource):
+    """Turn the user's own hold into a confirmed booking and release the hold."""
+    booking = create_booking(user, {
+        'resource': resource,
+        'starts_at': datetime.fromisoformat(hold['starts_at']),
+        'ends_at': datetime.fromisoformat(hold['ends_at']),
+        'status': Booking.STATUS_CONFIRMED,
+    })
+    transaction.on_commit(lambda: holds.release_hold(hold))
+    return booking
+
+
+@transaction.atomic
+def expire_pending(booking_ids):
+    """
+    Cancel the given bookings if they are still pending, with a single
+    UPDATE ... RETURNING. Returns the (id, resource_id, starts_at, ends_at,
+    previous_status) rows that were actually expired.
+    """
+    expired = _cancel_where("id = ANY(%s) AND status = %s", [list(booking_ids), Booking.STATUS_PENDING])
+
+    occupancy.rebuild_many_on_commit(
+        (resource_id, starts_at, ends_at) for _, resource_id, starts_at, ends_at, _ in expired
     )
+    availability.bump_version_on_commit(*{row[1] for row in expired})
+    return expired
 
-    booking_ids = list(expired.values_list("id", flat=True))
-    resource_ids = list(expired.values_list("resource_id", flat=True))
 
-    count = expired.count()
+@transaction.atomic
+def update_booking(booking, validated_data):
+    previous = (booking.resource_id, booking.starts_at, booking.ends_at)
+    removed = rollup.rows([booking])
+    for key, value in validated_data.items():
+        setattr(booking, key, value)
+    with overlap_guard():
+        booking.save()
+    rollup.apply(added=rollup.rows([booking]), removed=removed)
+    availability.bump_version_on_commit(previous[0], booking.resource_id)
+    occupancy.rebuild_on_commit(*previous)
+    occupancy.rebuild_on_commit(booking.resource_id, booking.starts_at, booking.ends_at)
+    return booking
 
-    expired.update(status=Booking.STATUS_CANCELLED)
 
+@transaction.atomic
+def delete_booking(booking):
+    resource_id = booking.resource_id
+    rollup.apply(removed=rollup.rows([booking]))
+    booking.delete()
+    availability.bump_version_on_commit(resource_id)
+    occupancy.rebuild_on_commit(resource_id, booking.starts_at, booking.ends_at)
 
-    for b_id in booking_ids:
-        r.delete(f"booking_lock:{b_id}")
 
-    for r_id in resource_ids:
-        cache_key = f"availability:{r_id}"
-        cache.delete(cache_key)
+@transaction.atomic
+def cancel_booking(booking, actor):
+    # Conditional UPDATE rather than save(): if release_holds expires the
+    # booking concurrently, only one of them moves it in the rollup.
+    _cancel_where("id = %s AND status = ANY(%s)", [booking.id, list(Booking.ACTIVE_STATUSES)])
+    booking.status = Booking.STATUS_CANCELLED
+    availability.bump_version_on_commit(booking.resource_id)
+    occupancy.rebuild_on_commit(booking.resource_id, booking.starts_at, booking.ends_at)
 
-    return f"Released {count} expired holds"
\ No newline at end of file
+    audit.record(actor, 'cancel_booking', 'Booking', booking.id, {'status': booking.status})
+    return booking
@@ -0,0 +1,56 @@
+from celery import shared_task
+from celery.signals import worker_shutting_down
+
+from . import audit, exports, holds, rollup
+from .models import BookingExport
+from .services import expire_pending
+
+EXPIRY_BATCH_SIZE = 500
+
+
+@shared_task
+def release_holds(batch_size=EXPIRY_BATCH_SIZE):
+    """
+    Cancel pending bookings whose hold has expired. Only the ids due in the
+    pending_expiry sorted set are touched, so the cost follows the number of
+    expiring holds rather than the size of the Booking table.
+    """
+    released = 0
+    while True:
+        booking_ids = holds.due_for_expiry(batch_size)
+        if not booking_ids:
+            break
+        released += len(expire_pending(booking_ids))
+        holds.forget_expired(booking_ids)
+        if len(booking_ids) < batch_size:
+            break
+
+    return f"Released {released} expired holds"
+
+
+@shared_task
+def flush_audit_log():
+    return f"Flushed {audit.flush()} audit events"
+
+
+@shared_task
+def repair_occupancy_rollup(full=False):
+    return f"Re-aggregated {rollup.repair(full=full)} resource days"
+
+
+@shared_task
+def export_bookings(export_id):
+    export = BookingExport.objects.select_related('user').get(pk=export_id)
+    exports.run(export)
+    return f"Export {export_id}: {export.status}, {export.rows} rows"
+
+
+@shared_task
+def maintain_audit_partitions():
+    created, archived = audit.maintain_partitions()
+    return f"Created {len(created)} audit partitions, archived {len(archived)}"
+
+
+@worker_shutting_down.connect
+def flush_audit_log_on_shutdown(**kwargs):
+    audit.flush()
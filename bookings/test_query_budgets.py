@@ -0,0 +1,301 @@
+"""
+SQL query budgets for the API.
+
+Every endpoint runs against a seeded dataset and has to stay within a fixed
+number of queries. List-like endpoints are called once with a small and once
+with a large result and must issue the same number of queries for both, so
+a per-row lookup (N+1) fails the test even while it is cheap.
+
+Budgets count every statement, savepoints included. Clients are
+force-authenticated, so JWT authentication (one user lookup) is not part of
+them; on_commit callbacks don't run here and only touch Redis anyway.
+"""
+import pytest
+from datetime import datetime, time, timedelta
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from bookings.models import AuditLog, Booking, FileUpload
+from rooms.models import Room_Resources as Resource
+from users.models import PasswordResetToken, RefreshToken
+from users.utils import make_password_reset_token
+
+User = get_user_model()
+
+RESOURCES = 30
+BUSY_BOOKINGS = 20
+PASSWORD = 'budget-pass-123'
+
+
+@pytest.fixture(autouse=True)
+def no_throttling(monkeypatch):
+    # Throttles only use the cache, and some tests call more often than the anonymous rate allows.
+    monkeypatch.setattr(APIView, 'throttle_classes', ())
+
+
+@pytest.fixture
+def seeded(db):
+    """
+    Admin, member, RESOURCES resources and, on one day, a single booking on
+    the "quiet" resource and BUSY_BOOKINGS on the "busy" one.
+    """
+    admin = User.objects.create_user(
+        username='budget-admin', email='budget-admin@example.com', password=PASSWORD,
+        is_staff=True, is_superuser=True,
+    )
+    member = User.objects.create_user(username='budget-member', email='budget-member@example.com', password=PASSWORD)
+    resources = Resource.objects.bulk_create([
+        Resource(name=f'Budget room {n}', location=f'Floor {n % 5}', capacity=2 + n)
+        for n in range(RESOURCES)
+    ])
+    quiet, busy = resources[0], resources[1]
+
+    day = timezone.localdate() + timedelta(days=3)
+    opening = timezone.make_aware(datetime.combine(day, time(8)))
+    rows = [Booking(user=member, resource=quiet, starts_at=opening,
+                    ends_at=opening + timedelta(minutes=30), status=Booking.STATUS_CONFIRMED)]
+    for n in range(BUSY_BOOKINGS):
+        start = opening + timedelta(minutes=30 * n)
+        rows.append(Booking(user=member if n % 2 else admin, resource=busy, starts_at=start,
+                            ends_at=start + timedelta(minutes=30), status=Booking.STATUS_CONFIRMED))
+    bookings = Booking.objects.bulk_create(rows)
+    return admin, member, resources, day, bookings
+
+
+def _client(user=None):
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user=user)
+    return client
+
+
+def _queries(call):
+    """(response, number of queries) of call()."""
+    with CaptureQueriesContext(connection) as ctx:
+        response = call()
+    return response, len(ctx)
+
+
+def _slot(day, hour):
+    start = timezone.make_aware(datetime.combine(day, time(hour)))
+    return start.isoformat(), (start + timedelta(hours=1)).isoformat()
+
+
+# Resources
+
+
+def test_resource_list_budget_does_not_grow_with_results(seeded):
+    client = _client()
+    # Cached catalog bytes: warm requests don't hit the database at all.
+    few, few_queries = _queries(lambda: client.get('/api/rooms/resources/', {'capacity': RESOURCES}))
+    many, many_queries = _queries(lambda: client.get('/api/rooms/resources/'))
+    assert len(few.json()) == 2 and len(many.json()) == RESOURCES
+    assert few_queries == many_queries <= 1
+
+    _, warm_queries = _queries(lambda: client.get('/api/rooms/resources/'))
+    assert warm_queries == 0
+
+    # Paged: the page plus LimitOffsetPagination's COUNT(*).
+    page, page_queries = _queries(lambda: client.get('/api/rooms/resources/', {'limit': 5, 'offset': 5}))
+    assert page.status_code == 200 and len(page.json()['results']) == 5
+    assert page_queries <= 2
+
+
+def test_resource_detail_and_admin_actions_budget(seeded):
+    admin, _, resources, _, _ = seeded
+    client = _client(admin)
+    base = '/api/rooms/resources/'
+
+    response, count = _queries(lambda: client.get(f'{base}{resources[1].id}/'))
+    assert response.status_code == 200 and count <= 1
+
+    response, count = _queries(lambda: client.post(base, {
+        'name': 'Budget room new', 'location': 'Floor 9', 'capacity': 8,
+    }, format='json'))
+    assert response.status_code == 201 and count <= 1
+
+    response, count = _queries(lambda: client.put(
+        f'{base}{resources[2].id}/', {'capacity': 9}, format='json'
+    ))
+    assert response.status_code == 200 and count <= 2
+
+    # Deleting cascades to bookings, series and the rollup with one statement each,
+    # however many rows the resource has.
+    response, quiet_count = _queries(lambda: client.delete(f'{base}{resources[0].id}/'))
+    assert response.status_code == 204
+    response, busy_count = _queries(lambda: client.delete(f'{base}{resources[1].id}/'))
+    assert response.status_code == 204
+    assert quiet_count == busy_count <= 6
+
+
+# Bookings
+
+
+def test_booking_list_budget_does_not_grow_with_results(seeded):
+    _, member, resources, _, _ = seeded
+    client = _client(member)
+
+    few, few_queries = _queries(lambda: client.get('/api/bookings/', {'resource': resources[0].id}))
+    many, many_queries = _queries(lambda: client.get('/api/bookings/', {'resource': resources[1].id, 'limit': 100}))
+    assert len(few.json()['results']) == 1 and len(many.json()['results']) == BUSY_BOOKINGS
+    # Keyset pages: no COUNT(*), just the page.
+    assert few_queries == many_queries <= 1
+
+    mine, mine_queries = _queries(lambda: client.get('/api/bookings/', {'mine': 1, 'limit': 100}))
+    assert len(mine.json()['results']) == 1 + BUSY_BOOKINGS // 2
+    assert mine_queries <= 1
+
+
+def test_booking_detail_and_write_actions_budget(seeded):
+    _, member, resources, day, bookings = seeded
+    client = _client(member)
+    own = bookings[0]
+
+    response, count = _queries(lambda: client.get(f'/api/bookings/{own.id}/'))
+    assert response.status_code == 200 and count <= 1
+
+    # Resource lookup, then INSERTs of the booking, its rollup row and audit row in a savepoint.
+    starts_at, ends_at = _slot(day, 18)
+    response, count = _queries(lambda: client.post('/api/bookings/', {
+        'resource': resources[2].id, 'starts_at': starts_at, 'ends_at': ends_at,
+    }, format='json'))
+    assert response.status_code == 201 and count <= 6
+    created = response.json()['id']
+
+    starts_at, ends_at = _slot(day, 19)
+    response, count = _queries(lambda: client.put(f'/api/bookings/{created}/', {
+        'resource': resources[2].id, 'starts_at': starts_at, 'ends_at': ends_at,
+    }, format='json'))
+    assert response.status_code == 200 and count <= 6
+
+    starts_at, ends_at = _slot(day, 20)
+    response, count = _queries(lambda: client.patch(f'/api/bookings/{created}/', {
+        'resource': resources[3].id, 'starts_at': starts_at, 'ends_at': ends_at,
+    }, format='json'))
+    assert response.status_code == 200 and count <= 6
+
+    response, count = _queries(lambda: client.post(f'/api/bookings/{own.id}/cancel/'))
+    assert response.status_code == 200 and count <= 6
+
+    response, count = _queries(lambda: client.delete(f'/api/bookings/{created}/'))
+    assert response.status_code == 204 and count <= 5
+
+
+def test_bulk_booking_budget_does_not_grow_with_items(seeded):
+    _, member, resources, day, _ = seeded
+    client = _client(member)
+
+    def bulk(size, first_hour):
+        items = []
+        for n in range(size):
+            starts_at, ends_at = _slot(day + timedelta(days=1 + n // 12), first_hour + n % 12)
+            items.append({'resource': resources[2 + n % 5].id, 'starts_at': starts_at, 'ends_at': ends_at})
+        return _queries(lambda: client.post('/api/bookings/bulk/', {'bookings': items}, format='json'))
+
+    few, few_queries = bulk(2, 8)
+    many, many_queries = bulk(60, 8 + 1)
+    assert few.status_code == many.status_code == 201
+    assert len(few.json()['created']) == 2 and len(many.json()['created']) == 60
+    assert few_queries == many_queries <= 7
+
+
+def test_resource_availability_budget_does_not_grow_with_bookings(seeded):
+    _, member, resources, day, _ = seeded
+    client = _client(member)
+
+    def availability(resource):
+        return _queries(lambda: client.get(
+            f'/api/bookings/resources/{resource.id}/availability/', {'date': day.isoformat()}
+        ))
+
+    quiet, quiet_queries = availability(resources[0])
+    busy, busy_queries = availability(resources[1])
+    assert len(quiet.json()['busy_slots']) == 1 and len(busy.json()['busy_slots']) == BUSY_BOOKINGS
+    # Resource lookup and, on a cold cache, one range scan for the day.
+    assert quiet_queries == busy_queries <= 2
+
+    _, warm_queries = availability(resources[1])
+    assert warm_queries <= 1
+
+    week, week_queries = _queries(lambda: client.get(
+        f'/api/bookings/resources/{resources[1].id}/availability/',
+        {'from': day.isoformat(), 'to': (day + timedelta(days=6)).isoformat()},
+    ))
+    assert week.status_code == 200 and week_queries <= 2
+
+
+# Authentication
+
+
+def test_register_login_refresh_logout_budget(seeded):
+    client = _client()
+
+    response, count = _queries(lambda: client.post('/api/users/register/', {
+        'email': 'budget-new@example.com', 'username': 'budget-new', 'password': PASSWORD,
+    }, format='json'))
+    # Email and username uniqueness checks, INSERT.
+    assert response.status_code == 201 and count <= 3
+
+    response, count = _queries(lambda: client.post('/api/users/login/', {
+        'email': 'budget-new@example.com', 'password': PASSWORD,
+    }, format='json'))
+    assert response.status_code == 200 and count <= 2
+    tokens = response.json()
+
+    response, count = _queries(lambda: client.post(
+        '/api/users/refresh/', {'refresh_token': tokens['refresh_token']}, format='json'
+    ))
+    # Token and user fetched together under FOR UPDATE, revoke, INSERT, in a savepoint.
+    assert response.status_code == 200 and count <= 5
+    refresh_token = response.json()['refresh_token']
+
+    user = User.objects.get(email='budget-new@example.com')
+    response, count = _queries(lambda: _client(user).post(
+        '/api/users/logout/', {'refresh_token': refresh_token}, format='json'
+    ))
+    assert response.status_code == 200 and count <= 1
+    assert RefreshToken.objects.filter(user=user, revoked=False).count() == 0
+
+
+def test_forgot_reset_me_budget(seeded):
+    _, member, _, _, _ = seeded
+    client = _client()
+
+    response, count = _queries(lambda: client.post(
+        '/api/users/forgot/', {'email': member.email}, format='json'
+    ))
+    assert response.status_code == 200 and count <= 1
+
+    response, count = _queries(lambda: client.post('/api/users/reset/', {
+        'token': make_password_reset_token(member), 'new_password': 'budget-pass-456',
+    }, format='json'))
+    assert response.status_code == 200 and count <= 10
+
+    response, count = _queries(lambda: _client(member).get('/api/users/me/'))
+    assert response.status_code == 200 and count == 0
+
+
+def test_model_str_does_not_follow_foreign_keys(seeded, django_assert_num_queries):
+    admin, member, resources, _, bookings = seeded
+    booking = bookings[0]
+    upload = FileUpload.objects.create(owner_user=member, path='uploads/budget.csv', size_bytes=1, mime='text/csv')
+    entry = AuditLog.objects.create(actor_user=admin, action='create_booking', entity='Booking', entity_id=booking.id)
+    refresh = RefreshToken.objects.create(user=member, token='budget-token', expires_at=timezone.now())
+    reset = PasswordResetToken.objects.create(user=member, token='budget-reset', expires_at=timezone.now())
+    objects = [
+        Booking.objects.get(pk=booking.pk),
+        FileUpload.objects.get(pk=upload.pk),
+        AuditLog.objects.get(pk=entry.pk),
+        RefreshToken.objects.get(pk=refresh.pk),
+        PasswordResetToken.objects.get(pk=reset.pk),
+    ]
+
+    with django_assert_num_queries(0):
+        labels = [str(obj) for obj in objects]
+    assert labels[0] == (
+        f"Booking #{booking.pk} by user {member.id} for resource {resources[0].id} ({Booking.STATUS_CONFIRMED})"
+    )
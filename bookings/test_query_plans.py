@@ -0,0 +1,134 @@
+"""
+Plan checks for the hot booking queries.
+
+Each test runs a code path against a seeded table where cancelled history
+dominates, captures its SQL and EXPLAINs it: none of the statements may fall
+back to a sequential scan of bookings_booking.
+"""
+import pytest
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from bookings import holds
+from bookings.models import Booking
+from bookings.tasks import release_holds
+from rooms.models import Room_Resources as Resource
+
+User = get_user_model()
+
+RESOURCES = 200
+CANCELLED_PER_RESOURCE = 100
+PAST_PER_RESOURCE = 20
+
+
+@pytest.fixture
+def seeded(db):
+    users = User.objects.bulk_create([
+        User(username=f'plan{n}', email=f'plan{n}@example.com') for n in range(20)
+    ])
+    resources = Resource.objects.bulk_create([
+        Resource(name=f'Plan room {n}', location=f'Floor {n % 10}', capacity=2 + n % 20)
+        for n in range(RESOURCES)
+    ])
+    now = timezone.now().replace(minute=0, second=0, microsecond=0)
+    rows = []
+    for r_index, resource in enumerate(resources):
+        user = users[r_index % len(users)]
+        for n in range(CANCELLED_PER_RESOURCE):
+            start = now - timedelta(days=30) + timedelta(hours=n * 7)
+            rows.append(Booking(user=user, resource=resource, starts_at=start,
+                                ends_at=start + timedelta(hours=2), status=Booking.STATUS_CANCELLED))
+        for n in range(PAST_PER_RESOURCE):
+            start = now - timedelta(days=60) + timedelta(days=n)
+            rows.append(Booking(user=user, resource=resource, starts_at=start,
+                                ends_at=start + timedelta(hours=1), status=Booking.STATUS_CONFIRMED))
+        start = now + timedelta(days=2, hours=r_index % 8)
+        rows.append(Booking(user=user, resource=resource, starts_at=start,
+                            ends_at=start + timedelta(hours=1), status=Booking.STATUS_PENDING))
+    Booking.objects.bulk_create(rows, batch_size=5000)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE bookings_booking')
+    return users[0], resources, now
+
+
+def booking_seq_scans(captured):
+    """(sql, node) pairs for every Seq Scan on bookings_booking in the captured plans."""
+    found = []
+    with connection.cursor() as cursor:
+        for query in captured:
+            sql = query['sql']
+            if 'bookings_booking' not in sql:
+                continue
+            if not sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE', 'INSERT')):
+                continue
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+            found.extend((sql, node) for node in _walk(plan[0]['Plan'])
+                         if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') == 'bookings_booking')
+    return found
+
+
+def _walk(node):
+    yield node
+    for child in node.get('Plans', ()):
+        yield from _walk(child)
+
+
+def _client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+def test_create_booking_plans_use_indexes(seeded):
+    user, resources, now = seeded
+    start = now + timedelta(days=3)
+    with CaptureQueriesContext(connection) as ctx:
+        response = _client(user).post('/api/bookings/', {
+            "resource": resources[0].id,
+            "starts_at": start.isoformat(),
+            "ends_at": (start + timedelta(hours=1)).isoformat(),
+        }, format='json')
+    assert response.status_code == 201
+    assert booking_seq_scans(ctx.captured_queries) == []
+
+
+def test_resource_availability_plans_use_indexes(seeded):
+    user, resources, now = seeded
+    day = timezone.localtime(now + timedelta(days=2)).date()
+    client = _client(user)
+    with CaptureQueriesContext(connection) as ctx:
+        assert client.get(
+            f'/api/bookings/resources/{resources[1].id}/availability/', {'date': day.isoformat()}
+        ).status_code == 200
+        assert client.get(f'/api/bookings/resources/{resources[2].id}/availability/', {
+            'from': day.isoformat(), 'to': (day + timedelta(days=6)).isoformat()
+        }).status_code == 200
+    assert booking_seq_scans(ctx.captured_queries) == []
+
+
+def test_search_free_resources_plan_uses_indexes(seeded, settings):
+    settings.OCCUPANCY_INDEX_ENABLED = False
+    user, resources, now = seeded
+    start = now + timedelta(days=2)
+    with CaptureQueriesContext(connection) as ctx:
+        assert _client(user).get('/api/bookings/resources/search/', {
+            'starts_at': start.isoformat(),
+            'ends_at': (start + timedelta(hours=1)).isoformat(),
+        }).status_code == 200
+    assert booking_seq_scans(ctx.captured_queries) == []
+
+
+def test_release_holds_plans_use_indexes(seeded):
+    due = list(
+        Booking.objects.filter(status=Booking.STATUS_PENDING).values_list('id', flat=True)[:50]
+    )
+    holds.r.zadd(holds.PENDING_EXPIRY_KEY, {str(booking_id): 0 for booking_id in due})
+    with CaptureQueriesContext(connection) as ctx:
+        release_holds()
+    assert Booking.objects.filter(id__in=due, status=Booking.STATUS_CANCELLED).count() == len(due)
+    assert booking_seq_scans(ctx.captured_queries) == []
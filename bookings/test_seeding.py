@@ -0,0 +1,36 @@
+import io
+from datetime import date
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+
+from bookings.models import AuditLog, Booking
+from rooms.models import Room_Resources
+from users.models import RefreshToken
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_seed_roomtime_copies_rows_and_restores_constraints():
+    call_command(
+        'seed_roomtime', users=5, resources=3, bookings=90, days=10, days_ahead=2,
+        start=date(2030, 1, 15), seed=3, skip_rollup=True, stdout=io.StringIO(),
+    )
+    assert User.objects.filter(email__startswith='seed').count() == 5
+    assert Booking.objects.count() == 90
+    assert AuditLog.objects.filter(action='create_booking').count() == 90
+    assert RefreshToken.objects.count() == 10
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = 'bookings_booking'::regclass")
+        assert 'booking_no_overlap' in {row[0] for row in cursor.fetchall()}
+
+    # Sequences continue after the copied ids.
+    booking = Booking.objects.order_by('id').last()
+    resource = Room_Resources.objects.create(name='After seed', location='Location S', capacity=2)
+    assert resource.id > booking.resource_id
+    assert Booking.objects.create(
+        user=booking.user, resource=resource, starts_at=booking.starts_at, ends_at=booking.ends_at
+    ).id > booking.id
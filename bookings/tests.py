@@ -1,10 +1,20 @@
+import gzip
+import json
 import pytest
+import threading
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from datetime import timedelta
 from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
-from rooms.models import Resource
-from bookings.models import Booking
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rooms.models import Room_Resources as Resource
+from bookings.models import Booking, BookingSeries, AuditLog, ResourceDailyOccupancy
+from bookings.services import HELD_ERROR, MAX_SERIES_OCCURRENCES, cancel_series, expire_pending
+from bookings.tasks import export_bookings, release_holds
+from bookings.availability import day_bounds, free_intervals
+from bookings import audit, holds, occupancy, rollup
 
 User = get_user_model()
 
@@ -108,4 +118,720 @@ def test_resource_availability():
     
     assert response.status_code == 200
     assert response.data['available'] == True
-    assert response.data['resource_id'] == resource.id
\ No newline at end of file
+    assert response.data['resource_id'] == resource.id
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_bookings_never_double_book():
+    users = [
+        User.objects.create_user(username=f'race{i}', email=f'race{i}@example.com', password='pass123')
+        for i in range(8)
+    ]
+    resource = Resource.objects.create(name='Room E', location='Location E', capacity=6)
+
+    start = timezone.now() + timedelta(days=2)
+    end = start + timedelta(hours=1)
+    barrier = threading.Barrier(len(users))
+    statuses = []
+
+    def book(user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        try:
+            barrier.wait()
+            response = client.post('/api/bookings/', {
+                "resource": resource.id,
+                "starts_at": start.isoformat(),
+                "ends_at": end.isoformat()
+            }, format='json')
+            statuses.append(response.status_code)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=book, args=(user,)) for user in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses.count(201) == 1
+    assert statuses.count(400) == len(users) - 1
+    assert Booking.objects.filter(resource=resource, status__in=Booking.ACTIVE_STATUSES).count() == 1
+
+
+@pytest.mark.django_db
+def test_resource_availability_range_returns_free_slots():
+    user = User.objects.create_user(
+        username='test5',
+        email='test5@example.com',
+        password='pass123'
+    )
+    resource = Resource.objects.create(name='Room F', location='Location F', capacity=4)
+    day = (timezone.localtime() + timedelta(days=3)).date()
+    next_day = day + timedelta(days=1)
+    window_start, window_end = day_bounds(day, next_day)
+
+    Booking.objects.create(
+        user=user,
+        resource=resource,
+        starts_at=window_start + timedelta(hours=9),
+        ends_at=window_start + timedelta(hours=10, minutes=10),
+        status='confirmed'
+    )
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    response = client.get(
+        f'/api/bookings/resources/{resource.id}/availability/'
+        f'?from={day:%Y-%m-%d}&to={next_day:%Y-%m-%d}&slot_minutes=30'
+    )
+
+    assert response.status_code == 200
+    assert response.data['free_slots'] == [
+        {
+            "starts_at": window_start.isoformat(),
+            "ends_at": (window_start + timedelta(hours=9)).isoformat(),
+        },
+        {
+            "starts_at": (window_start + timedelta(hours=10, minutes=30)).isoformat(),
+            "ends_at": window_end.isoformat(),
+        },
+    ]
+
+
+def test_free_intervals_merges_overlapping_busy_intervals():
+    start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    end = start + timedelta(hours=4)
+    busy = [
+        (start - timedelta(hours=1), start + timedelta(minutes=20)),
+        (start + timedelta(hours=1), start + timedelta(hours=2)),
+        (start + timedelta(minutes=90), start + timedelta(hours=3)),
+    ]
+
+    assert free_intervals(busy, start, end, slot_minutes=15) == [
+        (start + timedelta(minutes=30), start + timedelta(hours=1)),
+        (start + timedelta(hours=3), end),
+    ]
+
+
+@pytest.mark.django_db
+def test_resource_availability_cache_is_invalidated_by_cancel(django_capture_on_commit_callbacks):
+    user = User.objects.create_user(
+        username='test6',
+        email='test6@example.com',
+        password='pass123'
+    )
+    resource = Resource.objects.create(name='Room G', location='Location G', capacity=4)
+    day = (timezone.localtime() + timedelta(days=4)).date()
+    day_start, _ = day_bounds(day)
+    booking = Booking.objects.create(
+        user=user,
+        resource=resource,
+        starts_at=day_start + timedelta(hours=12),
+        ends_at=day_start + timedelta(hours=13),
+        status='confirmed'
+    )
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = f'/api/bookings/resources/{resource.id}/availability/?date={day:%Y-%m-%d}'
+
+    assert client.get(url).data['available'] is False
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(f'/api/bookings/{booking.id}/cancel/')
+    assert response.status_code == 200
+
+    assert client.get(url).data['available'] is True
+
+
+@pytest.mark.django_db
+def test_search_free_resources_excludes_busy_rooms_and_orders_by_fit():
+    user = User.objects.create_user(
+        username='test7',
+        email='test7@example.com',
+        password='pass123'
+    )
+    busy = Resource.objects.create(name='Busy', location='Tower', capacity=6)
+    snug = Resource.objects.create(name='Snug', location='Tower', capacity=6)
+    roomy = Resource.objects.create(name='Roomy', location='Tower', capacity=12)
+    Resource.objects.create(name='Tiny', location='Tower', capacity=2)
+    Resource.objects.create(name='Elsewhere', location='Annex', capacity=8)
+
+    start = timezone.now() + timedelta(days=5)
+    end = start + timedelta(hours=1)
+    Booking.objects.create(
+        user=user,
+        resource=busy,
+        starts_at=start - timedelta(minutes=30),
+        ends_at=start + timedelta(minutes=30),
+        status='pending'
+    )
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    response = client.get('/api/bookings/resources/search/', {
+        "starts_at": start.isoformat(),
+        "ends_at": end.isoformat(),
+        "capacity": 4,
+        "location": "tower",
+    })
+
+    assert response.status_code == 200
+    assert [item['id'] for item in response.data['results']] == [snug.id, roomy.id]
+
+
+@pytest.mark.django_db
+def test_occupancy_index_tracks_create_and_cancel(django_capture_on_commit_callbacks):
+    user = User.objects.create_user(
+        username='test8',
+        email='test8@example.com',
+        password='pass123'
+    )
+    resource = Resource.objects.create(name='Room H', location='Location H', capacity=4)
+    day = (timezone.localtime() + timedelta(days=6)).date()
+    day_start, _ = day_bounds(day)
+    start = day_start + timedelta(hours=9)
+    end = start + timedelta(minutes=45)
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post('/api/bookings/', {
+            "resource": resource.id,
+            "starts_at": start.isoformat(),
+            "ends_at": end.isoformat()
+        }, format='json')
+    assert response.status_code == 201
+
+    assert occupancy.busy_slot_counts([resource.id], start, end)[resource.id] == 3
+    assert occupancy.is_free(resource.id, end, end + timedelta(minutes=15))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post(f"/api/bookings/{response.data['id']}/cancel/")
+
+    assert occupancy.is_free(resource.id, start, end)
+
+
+@pytest.mark.django_db
+def test_bulk_booking_best_effort_reports_conflicts_per_item(django_assert_max_num_queries):
+    user = User.objects.create_user(
+        username='test9',
+        email='test9@example.com',
+        password='pass123'
+    )
+    resource = Resource.objects.create(name='Room I', location='Location I', capacity=4)
+    start = timezone.now().replace(microsecond=0) + timedelta(days=7)
+    Booking.objects.create(
+        user=user,
+        resource=resource,
+        starts_at=start,
+        ends_at=start + timedelta(hours=1),
+        status='confirmed'
+    )
+
+    slots = [
+        (start + timedelta(hours=2 * n), start + timedelta(hours=2 * n + 1))
+        for n in range(1, 21)
+    ]
+    payload = [
+        {"resource": resource.id, "starts_at": s.isoformat(), "ends_at": e.isoformat()}
+        for s, e in slots
+    ]
+    payload.append({
+        "resource": resource.id,
+        "starts_at": (start + timedelta(minutes=30)).isoformat(),
+        "ends_at": (start + timedelta(minutes=90)).isoformat(),
+    })
+    payload.append(dict(payload[0]))
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    with django_assert_max_num_queries(8):
+        response = client.post('/api/bookings/bulk/', {
+            "bookings": payload,
+            "all_or_nothing": False
+        }, format='json')
+
+    assert response.status_code == 201
+    assert len(response.data['created']) == 20
+    assert [error['index'] for error in response.data['errors']] == [20, 21]
+    assert AuditLog.objects.filter(action='create_booking', actor_user=user).count() == 20
+
+
+@pytest.mark.django_db
+def test_bulk_booking_all_or_nothing_creates_nothing_on_conflict():
+    user = User.objects.create_user(
+        username='test10',
+        email='test10@example.com',
+        password='pass123'
+    )
+    resource = Resource.objects.create(name='Room J', location='Location J', capacity=4)
+    start = timezone.now() + timedelta(days=8)
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    response = client.post('/api/bookings/bulk/', {
+        "bookings": [
+            {"resource": resource.id, "starts_at": start.isoformat(),
+             "ends_at": (start + timedelta(hours=1)).isoformat()},
+            {"resource": resource.id, "starts_at": (start + timedelta(minutes=30)).isoformat(),
+             "ends_at": (start + timedelta(hours=2)).isoformat()},
+        ]
+    }, format='json')
+
+    assert response.status_code == 400
+    assert response.data['errors'][0]['index'] == 1
+    assert not Booking.objects.filter(resource=resource).exists()
+
+
+@pytest.mark.django_db
+def test_weekly_series_skips_conflicts_and_cancels_in_one_update():
+    user = User.objects.create_user(
+        username='test11',
+        email='test11@example.com',
+        password='pass123'
+    )
+    resource = Resource.objects.create(name='Room K', location='Location K', capacity=8)
+    start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+    end = start + timedelta(hours=1)
+    Booking.objects.create(
+        user=user,
+        resource=resource,
+        starts_at=start + timedelta(weeks=2),
+        ends_at=end + timedelta(weeks=2),
+        status='confirmed'
+    )
+    payload = {
+        "resource": resource.id,
+        "frequency": "weekly",
+        "starts_at": start.isoformat(),
+        "ends_at": end.isoformat(),
+        "count": 5,
+    }
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    response = client.post('/api/bookings/series/', payload, format='json')
+    assert response.status_code == 400
+    assert [parse_datetime(value) for value in response.data['conflicts']] == [start + timedelta(weeks=2)]
+
+    response = client.post('/api/bookings/series/', {**payload, "skip_conflicts": True}, format='json')
+    assert response.status_code == 201
+    assert len(response.data['bookings']) == 4
+
+    # Every occurrence taken: nothing to create even when skipping conflicts.
+    lone = {**payload, "starts_at": (start + timedelta(weeks=2)).isoformat(),
+            "ends_at": (end + timedelta(weeks=2)).isoformat(), "count": 1, "skip_conflicts": True}
+    assert client.post('/api/bookings/series/', lone, format='json').status_code == 400
+    # An until that would need more than MAX_SERIES_OCCURRENCES is rejected, not truncated.
+    far = {key: value for key, value in payload.items() if key != "count"}
+    far["until"] = (start + timedelta(weeks=MAX_SERIES_OCCURRENCES + 1)).date().isoformat()
+    assert client.post('/api/bookings/series/', far, format='json').status_code == 400
+
+    series = BookingSeries.objects.get(pk=response.data['id'])
+    with CaptureQueriesContext(connection) as captured:
+        cancelled = cancel_series(series, user)
+    assert cancelled == 4
+    assert sum(1 for query in captured.captured_queries if query['sql'].lstrip().startswith('UPDATE')) == 1
+    assert not Booking.objects.filter(series=series, status__in=Booking.ACTIVE_STATUSES).exists()
+
+
+@pytest.mark.django_db
+def test_hold_blocks_other_users_until_confirmed(django_capture_on_commit_callbacks):
+    owner = User.objects.create_user(username='test12', email='test12@example.com', password='pass123')
+    other = User.objects.create_user(username='test13', email='test13@example.com', password='pass123')
+    resource = Resource.objects.create(name='Room L', location='Location L', capacity=4)
+    start = timezone.now() + timedelta(days=9)
+    slot = {
+        "resource": resource.id,
+        "starts_at": start.isoformat(),
+        "ends_at": (start + timedelta(hours=1)).isoformat()
+    }
+
+    owner_client = APIClient()
+    owner_client.force_authenticate(user=owner)
+    other_client = APIClient()
+    other_client.force_authenticate(user=other)
+
+    response = owner_client.post('/api/bookings/hold/', slot, format='json')
+    assert response.status_code == 201
+    token = response.data['token']
+
+    assert other_client.post('/api/bookings/hold/', slot, format='json').status_code == 409
+    response = other_client.post('/api/bookings/', slot, format='json')
+    assert response.status_code == 400
+    assert "удерживается" in str(response.data)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = owner_client.post(f'/api/bookings/hold/{token}/confirm/')
+    assert response.status_code == 201
+    assert response.data['status'] == 'confirmed'
+    assert holds.get_hold(token) is None
+
+
+@pytest.mark.django_db
+def test_hold_blocks_bulk_items_of_other_users():
+    owner = User.objects.create_user(username='test12', email='test12@example.com', password='pass123')
+    other = User.objects.create_user(username='test13', email='test13@example.com', password='pass123')
+    resource = Resource.objects.create(name='Room L', location='Location L', capacity=4)
+    start = timezone.now().replace(microsecond=0) + timedelta(days=9)
+    holds.place_hold(owner, resource.id, start, start + timedelta(hours=1))
+    items = [
+        {"resource": resource.id, "starts_at": (start + timedelta(hours=n)).isoformat(),
+         "ends_at": (start + timedelta(hours=n + 1)).isoformat()}
+        for n in range(2)
+    ]
+
+    client = APIClient()
+    client.force_authenticate(user=other)
+    response = client.post('/api/bookings/bulk/', {"bookings": items, "all_or_nothing": False}, format='json')
+    assert response.status_code == 201
+    assert len(response.data['created']) == 1
+    assert response.data['errors'] == [{"index": 0, "errors": [HELD_ERROR]}]
+
+    # The holder books its own slot.
+    client.force_authenticate(user=owner)
+    response = client.post('/api/bookings/bulk/', {"bookings": items[:1]}, format='json')
+    assert response.status_code == 201
+
+
+@pytest.mark.django_db
+def test_hold_blocks_series_occurrences_of_other_users():
+    owner = User.objects.create_user(username='test12', email='test12@example.com', password='pass123')
+    other = User.objects.create_user(username='test13', email='test13@example.com', password='pass123')
+    resource = Resource.objects.create(name='Room L', location='Location L', capacity=4)
+    start = timezone.now().replace(microsecond=0) + timedelta(days=9)
+    end = start + timedelta(hours=1)
+    holds.place_hold(owner, resource.id, start + timedelta(days=1), end + timedelta(days=1))
+    payload = {
+        "resource": resource.id,
+        "frequency": "daily",
+        "starts_at": start.isoformat(),
+        "ends_at": end.isoformat(),
+        "count": 3,
+    }
+
+    client = APIClient()
+    client.force_authenticate(user=other)
+    response = client.post('/api/bookings/series/', payload, format='json')
+    assert response.status_code == 400
+    assert [parse_datetime(value) for value in response.data['conflicts']] == [start + timedelta(days=1)]
+
+    response = client.post('/api/bookings/series/', {**payload, "skip_conflicts": True}, format='json')
+    assert response.status_code == 201
+    assert len(response.data['bookings']) == 2
+
+
+@pytest.mark.django_db
+def test_release_holds_only_cancels_due_pending_bookings(django_capture_on_commit_callbacks):
+    user = User.objects.create_user(username='test14', email='test14@example.com', password='pass123')
+    resource = Resource.objects.create(name='Room M', location='Location M', capacity=4)
+    start = timezone.now() + timedelta(days=10)
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    ids = []
+    for n in range(2):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.post('/api/bookings/', {
+                "resource": resource.id,
+                "starts_at": (start + timedelta(hours=n)).isoformat(),
+                "ends_at": (start + timedelta(hours=n, minutes=30)).isoformat()
+            }, format='json')
+        ids.append(response.data['id'])
+
+    holds.r.zadd(holds.PENDING_EXPIRY_KEY, {str(ids[0]): 0})
+
+    assert release_holds() == "Released 1 expired holds"
+    assert Booking.objects.get(pk=ids[0]).status == 'cancelled'
+    assert Booking.objects.get(pk=ids[1]).status == 'pending'
+    assert holds.due_for_expiry(10) == []
+
+
+@pytest.mark.django_db
+def test_expiring_many_pending_bookings_rebuilds_each_resource_once(django_capture_on_commit_callbacks):
+    user = User.objects.create_user(username='test14b', email='test14b@example.com', password='pass123')
+    rooms = [Resource.objects.create(name=f'Room M{n}', location='Location M', capacity=4) for n in range(2)]
+    start = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=10)
+    pending = Booking.objects.bulk_create([
+        Booking(user=user, resource=rooms[n % 2], starts_at=start + timedelta(hours=n),
+                ends_at=start + timedelta(hours=n, minutes=30))
+        for n in range(6)
+    ])
+
+    with CaptureQueriesContext(connection) as ctx, django_capture_on_commit_callbacks(execute=True):
+        expired = expire_pending([booking.id for booking in pending])
+    assert len(expired) == 6
+    # One busy_intervals read per resource for the occupancy rebuild, not one per booking.
+    reads = [query for query in ctx.captured_queries
+             if query['sql'].startswith('SELECT') and 'bookings_booking' in query['sql']]
+    assert len(reads) == 2
+    assert occupancy.busy_slot_counts([room.id for room in rooms], start, start + timedelta(hours=6)) == {
+        rooms[0].id: 0, rooms[1].id: 0
+    }
+
+
+@pytest.mark.django_db
+def test_async_audit_log_is_written_by_flush(settings, django_capture_on_commit_callbacks):
+    settings.AUDIT_LOG_ASYNC = True
+    user = User.objects.create_user(username='test15', email='test15@example.com', password='pass123')
+    resource = Resource.objects.create(name='Room N', location='Location N', capacity=4)
+    start = timezone.now() + timedelta(days=11)
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post('/api/bookings/', {
+            "resource": resource.id,
+            "starts_at": start.isoformat(),
+            "ends_at": (start + timedelta(hours=1)).isoformat()
+        }, format='json')
+    assert response.status_code == 201
+    assert not AuditLog.objects.filter(entity_id=response.data['id']).exists()
+
+    assert audit.flush() == 1
+    entry = AuditLog.objects.get(entity_id=response.data['id'])
+    assert entry.action == 'create_booking'
+    assert entry.actor_user_id == user.id
+
+
+@pytest.mark.django_db
+def test_audit_flush_dead_letters_bad_events_and_respects_foreign_lock():
+    user = User.objects.create_user(username='test15b', email='test15b@example.com', password='pass123')
+    good = audit.event(user, 'create_booking', 'Booking', 101)
+    orphan = {**audit.event(user, 'create_booking', 'Booking', 102), 'actor_user_id': user.id + 10_000}
+    audit.r.rpush(audit.QUEUE_KEY, json.dumps(good), json.dumps(orphan))
+
+    # Someone else's lock is neither ignored nor released.
+    audit.r.set(audit.FLUSH_LOCK_KEY, 'other-flusher')
+    assert audit.flush() == 0
+    assert audit.r.get(audit.FLUSH_LOCK_KEY) == 'other-flusher'
+    audit.r.delete(audit.FLUSH_LOCK_KEY)
+
+    # The orphan can never be inserted; it must not block the queue.
+    assert audit.flush() == 1
+    assert audit.r.llen(audit.QUEUE_KEY) == 0
+    assert [json.loads(item)['entity_id'] for item in audit.r.lrange(audit.DEAD_LETTER_KEY, 0, -1)] == [102]
+    assert list(AuditLog.objects.filter(entity_id__in=[101, 102]).values_list('entity_id', flat=True)) == [101]
+    assert audit.r.get(audit.FLUSH_LOCK_KEY) is None
+
+
+# Committed rows: a pending deferred FK check would block DROP TABLE of the partition.
+@pytest.mark.django_db(transaction=True)
+def test_audit_partitions_are_created_ahead_and_archived(settings, tmp_path):
+    settings.UPLOADS_ROOT = tmp_path
+    user = User.objects.create_user(username='test16', email='test16@example.com', password='pass123')
+    now = timezone.now()
+    current = now.date().replace(day=1)
+    expired = audit._add_months(current, -(settings.AUDIT_LOG_RETENTION_MONTHS + 1))
+    audit.create_partitions(expired, expired)
+    AuditLog.objects.create(
+        actor_user=user, action='create_booking', entity='booking', entity_id=1,
+        ts=now.replace(year=expired.year, month=expired.month, day=15),
+    )
+
+    created, archived = audit.maintain_partitions(months_ahead=2)
+
+    kept = audit.partitions()
+    assert expired not in kept
+    assert audit._add_months(current, 2) in kept
+    assert archived == [tmp_path / 'audit' / f"bookings_auditlog_{expired:%Y%m}.csv.gz"]
+    assert archived[0].exists()
+    assert not AuditLog.objects.filter(entity_id=1).exists()
+
+    # A row that landed in DEFAULT is moved into its month's partition when that is created.
+    late = audit._add_months(max(audit.partitions()), 1)
+    AuditLog.objects.create(
+        actor_user=user, action='create_booking', entity='booking', entity_id=2,
+        ts=now.replace(year=late.year, month=late.month, day=15),
+    )
+    assert audit.create_partitions(late, late) == [f"bookings_auditlog_{late:%Y%m}"]
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT entity_id FROM bookings_auditlog_{late:%Y%m}")
+        assert cursor.fetchall() == [(2,)]
+
+
+@pytest.mark.django_db
+def test_bookings_list_keyset_pagination_walks_both_ways_without_count():
+    user = User.objects.create_user(username='test17', email='test17@example.com', password='pass123')
+    start = timezone.now() + timedelta(days=12)
+    ids = []
+    for index in range(5):
+        # Two rooms share each start time, so paging has to break ties on id.
+        resource = Resource.objects.create(name=f'Room P{index}', location='Location P', capacity=2)
+        ids.append(Booking.objects.create(
+            user=user, resource=resource,
+            starts_at=start + timedelta(hours=index // 2), ends_at=start + timedelta(hours=index // 2 + 1)
+        ).id)
+    expected = [booking.id for booking in Booking.objects.filter(id__in=ids).order_by('ends_at', 'id')]
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    seen = []
+    url = '/api/bookings/?ordering=ends_at&limit=2'
+    pages = []
+    while url:
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        assert response.status_code == 200
+        assert not any('COUNT(' in query['sql'] for query in ctx.captured_queries)
+        pages.append(response.data)
+        seen.extend(item['id'] for item in response.data['results'])
+        url = response.data['next']
+    assert seen == expected
+    assert pages[0]['previous'] is None
+
+    back = client.get(pages[-1]['previous'])
+    assert [item['id'] for item in back.data['results']] == expected[2:4]
+    assert client.get('/api/bookings/?cursor=garbage').status_code == 404
+
+
+@pytest.mark.django_db
+def test_booking_search_is_fuzzy_and_orders_by_relevance():
+    user = User.objects.create_user(username='test18', email='test18@example.com', password='pass123')
+    hall = Resource.objects.create(name='Conference Hall', location='Main', capacity=40)
+    lounge = Resource.objects.create(name='Conference Lounge West', location='Main', capacity=10)
+    other = Resource.objects.create(name='Kitchen', location='Main', capacity=6)
+    start = timezone.now() + timedelta(days=13)
+    bookings = {
+        resource.id: Booking.objects.create(
+            user=user, resource=resource, starts_at=start, ends_at=start + timedelta(hours=1)
+        )
+        for resource in (hall, lounge, other)
+    }
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    response = client.get('/api/bookings/', {'search': 'conference hal', 'ordering': '-relevance'})
+    assert response.status_code == 200
+    assert [item['id'] for item in response.data['results']] == [bookings[hall.id].id, bookings[lounge.id].id]
+
+    response = client.get('/api/bookings/', {'ordering': '-relevance'})
+    assert response.status_code == 200
+    assert len(response.data['results']) == 3
+
+
+@pytest.mark.django_db
+def test_booking_export_writes_gzip_ndjson_of_own_bookings(settings, tmp_path):
+    settings.UPLOADS_ROOT = tmp_path
+    user = User.objects.create_user(username='test19', email='test19@example.com', password='pass123')
+    other = User.objects.create_user(username='test20', email='test20@example.com', password='pass123')
+    resource = Resource.objects.create(name='Room Q', location='Location Q', capacity=4)
+    start = timezone.now() + timedelta(days=14)
+    mine = [
+        Booking.objects.create(user=user, resource=resource, starts_at=start + timedelta(hours=n),
+                               ends_at=start + timedelta(hours=n, minutes=30))
+        for n in range(3)
+    ]
+    Booking.objects.create(user=other, resource=resource, starts_at=start + timedelta(hours=5),
+                           ends_at=start + timedelta(hours=6))
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    response = client.post('/api/bookings/exports/', {"format": "ndjson"}, format='json')
+    assert response.status_code == 201
+    assert response.data['status'] == 'pending'
+    assert client.get(f"/api/bookings/exports/{response.data['id']}/download/").status_code == 409
+
+    export_bookings(response.data['id'])
+
+    export = client.get(f"/api/bookings/exports/{response.data['id']}/").data
+    assert export['status'] == 'done'
+    assert export['rows'] == 3
+    download = client.get(export['download_url'])
+    assert download.status_code == 200
+    lines = gzip.decompress(b''.join(download.streaming_content)).decode().splitlines()
+    rows = [json.loads(line) for line in lines]
+    assert [row['id'] for row in rows] == [booking.id for booking in mine]
+    assert {row['user_email'] for row in rows} == {'test19@example.com'}
+    assert rows[0]['resource_name'] == 'Room Q'
+
+    for path in tmp_path.rglob('*.gz'):
+        path.unlink()
+    assert client.get(export['download_url']).status_code == 410
+
+
+@pytest.mark.django_db
+def test_resource_utilization_clips_bookings_to_opening_hours():
+    admin = User.objects.create_user(username='test21', email='test21@example.com', password='pass123', is_staff=True)
+    resource = Resource.objects.create(name='Room R', location='Location R', capacity=4)
+    idle = Resource.objects.create(name='Room S', location='Location S', capacity=4)
+    day = timezone.localdate() + timedelta(days=20)
+    day_start, _ = day_bounds(day)
+
+    def book(start_hour, end_hour, status='confirmed'):
+        Booking.objects.create(
+            user=admin, resource=resource, status=status,
+            starts_at=day_start + timedelta(hours=start_hour), ends_at=day_start + timedelta(hours=end_hour)
+        )
+
+    book(7, 10)            # 2h inside 08-20
+    book(9, 10, 'cancelled')
+    book(19, 33)           # 1h today, 1h tomorrow
+    book(33.25, 33.75)     # 0.5h tomorrow
+
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    response = client.get('/api/bookings/analytics/utilization/', {
+        'from': day.isoformat(), 'to': (day + timedelta(days=1)).isoformat(), 'open_from': 8, 'open_to': 20
+    })
+    assert response.status_code == 200
+    rows = {row['resource_id']: row for row in response.data['resources']}
+    assert rows[resource.id]['booked_hours'] == 4.5
+    assert rows[resource.id]['open_hours'] == 24.0
+    assert rows[resource.id]['utilization'] == 0.1875
+    assert rows[resource.id]['bookings'] == 3
+    assert rows[resource.id]['peak_hour'] == 8
+    assert rows[idle.id]['booked_hours'] == 0 and rows[idle.id]['peak_hour'] is None
+
+
+@pytest.mark.django_db
+def test_daily_occupancy_rollup_follows_writes_and_repairs():
+    admin = User.objects.create_user(username='test22', email='test22@example.com', password='pass123', is_staff=True)
+    resource = Resource.objects.create(name='Room T', location='Location T', capacity=4)
+    day = timezone.localdate() + timedelta(days=21)
+    day_start, _ = day_bounds(day)
+
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    created = client.post('/api/bookings/', {
+        "resource": resource.id,
+        "starts_at": (day_start + timedelta(hours=22)).isoformat(),
+        "ends_at": (day_start + timedelta(hours=25)).isoformat(),
+    }, format='json')
+    assert created.status_code == 201
+
+    def snapshot():
+        return {
+            (row.date, row.status): (row.booked_minutes, row.bookings)
+            for row in ResourceDailyOccupancy.objects.filter(resource=resource)
+            if row.booked_minutes or row.bookings
+        }
+
+    next_day = day + timedelta(days=1)
+    assert snapshot() == {(day, 'pending'): (120, 1), (next_day, 'pending'): (60, 0)}
+
+    assert client.post(f"/api/bookings/{created.data['id']}/cancel/").status_code == 200
+    assert snapshot() == {(day, 'cancelled'): (120, 1), (next_day, 'cancelled'): (60, 0)}
+
+    Booking.objects.filter(pk=created.data['id']).update(status='confirmed', updated_at=timezone.now())
+    assert rollup.repair() > 0
+    assert snapshot() == {(day, 'confirmed'): (120, 1), (next_day, 'confirmed'): (60, 0)}
+    Booking.objects.filter(pk=created.data['id']).update(updated_at=timezone.now() - timedelta(hours=1))
+    assert rollup.repair() == 0  # nothing changed since the watermark
+
+    response = client.get('/api/bookings/analytics/occupancy/', {
+        'from': day.isoformat(), 'to': next_day.isoformat(), 'resource': resource.id
+    })
+    assert response.status_code == 200
+    assert [(row['date'], row['booked_minutes'], row['bookings']) for row in response.data['days']] == [
+        (day, 120, 1), (next_day, 60, 0)
+    ]
+
+    # A cascade delete leaves nothing for the incremental repair to find; the nightly full run drops it.
+    Booking.objects.filter(pk=created.data['id']).delete()
+    rollup.repair()
+    assert snapshot() != {}
+    rollup.repair(full=True)
+    assert snapshot() == {}
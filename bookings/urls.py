@@ -1,10 +1,23 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import BookingViewSet, resource_availability
+from .views import (
+    BookingViewSet, BookingSeriesViewSet, BookingExportViewSet, resource_availability, search_free_resources,
+    place_hold, release_hold, confirm_hold_view, resource_holds, resource_utilization,
+    resource_daily_occupancy
+)
 
 router = DefaultRouter()
+router.register(r'series', BookingSeriesViewSet, basename='booking-series')
+router.register(r'exports', BookingExportViewSet, basename='booking-exports')
 router.register(r'', BookingViewSet, basename='bookings')
 
 urlpatterns = [
+    path('resources/search/', search_free_resources, name='resource-search'),
+    path('analytics/utilization/', resource_utilization, name='resource-utilization'),
+    path('analytics/occupancy/', resource_daily_occupancy, name='resource-daily-occupancy'),
     path('resources/<int:resource_id>/availability/', resource_availability, name='resource-availability'),
+    path('resources/<int:resource_id>/holds/', resource_holds, name='resource-holds'),
+    path('hold/', place_hold, name='hold-place'),
+    path('hold/<str:token>/', release_hold, name='hold-release'),
+    path('hold/<str:token>/confirm/', confirm_hold_view, name='hold-confirm'),
 ] + router.urls
\ No newline at end of file
@@ -1,17 +1,34 @@
-from rest_framework import viewsets, permissions, filters, status
+from rest_framework import viewsets, mixins, permissions, status
 from rest_framework.decorators import api_view, action, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.pagination import LimitOffsetPagination
-from .models import Booking, AuditLog
-from .serializers import BookingSerializer
-from .services import create_booking
+from .models import Booking, BookingExport, BookingSeries
+from .filters import RelevanceOrderingFilter, TrigramSearchFilter
+from .pagination import KeysetPagination
+from .serializers import (
+    BookingSerializer, BulkBookingSerializer, BulkBookingItemSerializer, BookingSeriesSerializer,
+    HoldSerializer, BookingExportSerializer
+)
+from .services import (
+    cancel_booking, delete_booking, create_bookings_bulk, create_series, cancel_series, confirm_hold
+)
+from .tasks import export_bookings
+from . import analytics, availability, holds, occupancy
 from rooms.models import Room_Resources
+from rooms.serializers.room_resources import ResourceListSerializer
+from rooms.services import room_resources as resource_service
 from datetime import datetime
+from django.conf import settings
+from django.db import transaction
+from django.http import FileResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from roomtime.conditional import conditional
+from roomtime.serialization import ValuesSerializer
 
-class BookingPagination(LimitOffsetPagination):
-    default_limit = 20
-    max_limit = 100
+class BookingPagination(KeysetPagination):
+    page_size = 20
+    max_page_size = 100
 
 
 class BookingViewSet(viewsets.ModelViewSet):
@@ -20,13 +37,26 @@ class BookingViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = BookingPagination
 
-    filter_backends = [filters.OrderingFilter, filters.SearchFilter]
-    ordering_fields = ['starts_at', 'ends_at', 'created_at']
+    filter_backends = [TrigramSearchFilter, RelevanceOrderingFilter]
+    ordering_fields = ['starts_at', 'ends_at', 'created_at', 'relevance']
     search_fields = ['resource__name', 'user__email']
 
+    # Read-only list path: values() rows instead of model instances, same output
+    list_serializer = ValuesSerializer(BookingSerializer)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.list_serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.list_serializer.many(page))
+        return Response(self.list_serializer.many(queryset))
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        delete_booking(instance)
+
     def get_queryset(self):
         qs = super().get_queryset()
         resource_id = self.request.query_params.get('resource')
@@ -38,12 +68,38 @@ class BookingViewSet(viewsets.ModelViewSet):
             qs = qs.filter(user=self.request.user)
         return qs
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        payload = BulkBookingSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        all_or_nothing = payload.validated_data['all_or_nothing']
+
+        items = []
+        errors = []
+        for index, raw in enumerate(payload.validated_data['bookings']):
+            item = BulkBookingItemSerializer(data=raw)
+            if item.is_valid():
+                items.append((index, item.validated_data))
+            else:
+                errors.append({"index": index, "errors": item.errors})
+
+        created = []
+        if items and not (errors and all_or_nothing):
+            created, conflicts = create_bookings_bulk(request.user, items, all_or_nothing)
+            errors = sorted(errors + conflicts, key=lambda error: error['index'])
+
+        return Response(
+            {
+                "created": BookingSerializer(created, many=True).data,
+                "errors": errors
+            },
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+        )
+
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
         booking = self.get_object()
-        if not request.user.is_superuser:
-            return Response(status_code=409,)
-        if booking.user != request.user:
+        if not request.user.is_superuser and booking.user_id != request.user.id:
             return Response(
                 {"error": "Вы можете отменять только свои бронирования"},
                 status=status.HTTP_403_FORBIDDEN
@@ -55,16 +111,7 @@ class BookingViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        booking.status = 'cancelled'
-        booking.save()
-
-        AuditLog.objects.create(
-            actor_user=request.user,
-            action='cancel_booking',
-            entity='Booking',
-            entity_id=booking.id,
-            meta={'status': booking.status}
-        )
+        cancel_booking(booking, request.user)
 
         return Response({
             "message": "Бронирование успешно отменено",
@@ -73,40 +120,169 @@ class BookingViewSet(viewsets.ModelViewSet):
         })
 
 
+class BookingSeriesViewSet(mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin,
+                           mixins.ListModelMixin,
+                           viewsets.GenericViewSet):
+    queryset = BookingSeries.objects.all()
+    serializer_class = BookingSeriesSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = BookingPagination
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if not self.request.user.is_superuser:
+            qs = qs.filter(user=self.request.user)
+        return qs
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        validated_data = dict(serializer.validated_data)
+        skip_conflicts = validated_data.pop('skip_conflicts')
+
+        series, bookings = create_series(request.user, validated_data, skip_conflicts)
+
+        data = self.get_serializer(series).data
+        data['bookings'] = BookingSerializer(bookings, many=True).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        series = self.get_object()
+        cancelled = cancel_series(series, request.user)
+        return Response({
+            "message": "Серия бронирований отменена",
+            "series_id": series.id,
+            "cancelled": cancelled
+        })
+
+
+class BookingExportViewSet(mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin,
+                           mixins.ListModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Background exports of bookings to gzip CSV/NDJSON. Creating one enqueues
+    bookings.tasks.export_bookings; poll the export until its status is done,
+    then fetch download_url.
+    """
+    queryset = BookingExport.objects.select_related('file')
+    serializer_class = BookingExportSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = BookingPagination
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if not self.request.user.is_superuser:
+            qs = qs.filter(user=self.request.user)
+        return qs
+
+    def perform_create(self, serializer):
+        export = serializer.save(user=self.request.user)
+        transaction.on_commit(lambda: export_bookings.delay(export.id))
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        export = self.get_object()
+        if export.status != BookingExport.STATUS_DONE or export.file is None:
+            return Response(
+                {"error": "Экспорт ещё не готов"},
+                status=status.HTTP_409_CONFLICT
+            )
+        path = settings.UPLOADS_ROOT / export.file.path
+        try:
+            handle = open(path, 'rb')
+        except FileNotFoundError:
+            return Response(
+                {"error": "Файл выгрузки удалён, создайте выгрузку заново"},
+                status=status.HTTP_410_GONE
+            )
+        return FileResponse(handle, as_attachment=True, filename=path.name, content_type=export.file.mime)
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _parse_moment(value):
+    moment = parse_datetime(value or '')
+    if moment is None:
+        raise ValueError(value)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def availability_version_keys(request, resource_id):
+    # The response also carries the resource name and is_active state.
+    return [availability.version_key(resource_id), resource_service.CATALOG_VERSION_KEY]
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional(availability_version_keys)
 def resource_availability(request, resource_id):
     date_str = request.GET.get('date')
-    if not date_str:
-        return Response({"error": "Параметр date обязателен (YYYY-MM-DD)"}, status=400)
+    from_str = request.GET.get('from')
+    to_str = request.GET.get('to')
+    if not date_str and not (from_str and to_str):
+        return Response(
+            {"error": "Укажите параметр date (YYYY-MM-DD) или диапазон from/to (YYYY-MM-DD)"},
+            status=400
+        )
 
     try:
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
+        if date_str:
+            first_day = last_day = _parse_date(date_str)
+        else:
+            first_day, last_day = _parse_date(from_str), _parse_date(to_str)
     except ValueError:
         return Response({"error": "Неверный формат даты. Используйте YYYY-MM-DD"}, status=400)
 
+    if last_day < first_day:
+        return Response({"error": "Дата to не может быть раньше from"}, status=400)
+    if (last_day - first_day).days >= availability.MAX_RANGE_DAYS:
+        return Response(
+            {"error": f"Диапазон не может превышать {availability.MAX_RANGE_DAYS} дней"},
+            status=400
+        )
+
+    try:
+        slot_minutes = int(request.GET.get('slot_minutes', availability.DEFAULT_SLOT_MINUTES))
+    except ValueError:
+        return Response({"error": "slot_minutes должен быть целым числом"}, status=400)
+    if not 1 <= slot_minutes <= 24 * 60:
+        return Response({"error": "slot_minutes должен быть от 1 до 1440"}, status=400)
+
     try:
         resource = Room_Resources.objects.get(pk=resource_id, is_active=True)
     except Room_Resources.DoesNotExist:
         return Response({"error": "Ресурс не найден или неактивен"}, status=404)
 
-    start_of_day = datetime.combine(date_obj, datetime.min.time())
-    end_of_day = datetime.combine(date_obj, datetime.max.time())
-
-    busy_slots = Booking.objects.filter(
-        resource=resource,
-        starts_at__lt=end_of_day,
-        ends_at__gt=start_of_day,
-        status__in=['pending', 'confirmed']
+    window_start, window_end = availability.day_bounds(first_day, last_day)
+    busy = availability.cached_busy_intervals(resource.id, first_day, last_day)
+    free_slots = availability.format_intervals(
+        availability.free_intervals(busy, window_start, window_end, slot_minutes)
     )
 
+    if not date_str:
+        return Response({
+            "resource_id": resource_id,
+            "resource_name": resource.name,
+            "from": from_str,
+            "to": to_str,
+            "slot_minutes": slot_minutes,
+            "free_slots": free_slots
+        })
+
     busy_intervals = [
         {
-            "starts_at": slot.starts_at.isoformat(),
-            "ends_at": slot.ends_at.isoformat(),
-            "status": slot.status
+            "starts_at": starts_at.isoformat(),
+            "ends_at": ends_at.isoformat(),
+            "status": slot_status
         }
-        for slot in busy_slots
+        for starts_at, ends_at, slot_status in busy
     ]
 
     available = len(busy_intervals) == 0
@@ -116,5 +292,187 @@ def resource_availability(request, resource_id):
         "resource_name": resource.name,
         "date": date_str,
         "available": available,
-        "busy_slots": busy_intervals
+        "busy_slots": busy_intervals,
+        "slot_minutes": slot_minutes,
+        "free_slots": free_slots
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_free_resources(request):
+    try:
+        start = _parse_moment(request.GET.get('starts_at'))
+        end = _parse_moment(request.GET.get('ends_at'))
+    except ValueError:
+        return Response(
+            {"error": "Параметры starts_at и ends_at обязательны (ISO 8601)"},
+            status=400
+        )
+    if start >= end:
+        return Response({"error": "Время окончания должно быть позже времени начала."}, status=400)
+
+    resources = resource_service.get_filtered_resources(request)
+    if occupancy.can_answer(start, end):
+        resources = occupancy.free_resources(resources, start, end)
+    else:
+        resources = availability.free_resources(resources, start, end)
+    results = ResourceListSerializer(resources, many=True).data
+
+    return Response({
+        "starts_at": start.isoformat(),
+        "ends_at": end.isoformat(),
+        "count": len(results),
+        "results": results
+    })
+
+
+def _hold_response(hold):
+    return {
+        "token": hold["token"],
+        "resource": hold["resource_id"],
+        "starts_at": hold["starts_at"],
+        "ends_at": hold["ends_at"],
+        "expires_at": hold["expires_at"]
+    }
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def place_hold(request):
+    serializer = HoldSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    resource = serializer.validated_data['resource']
+    start = serializer.validated_data['starts_at']
+    end = serializer.validated_data['ends_at']
+
+    if occupancy.can_answer(start, end):
+        booked = not occupancy.is_free(resource.id, start, end)
+    else:
+        booked = Booking.objects.filter(
+            resource=resource,
+            starts_at__lt=end,
+            ends_at__gt=start,
+            status__in=Booking.ACTIVE_STATUSES
+        ).exists()
+    if booked:
+        return Response({"error": "Ресурс уже забронирован в этот интервал времени."}, status=409)
+
+    try:
+        hold = holds.place_hold(request.user, resource.id, start, end)
+    except holds.HoldConflict:
+        return Response({"error": "Интервал временно удерживается другим пользователем."}, status=409)
+
+    return Response(_hold_response(hold), status=201)
+
+
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
+def release_hold(request, token):
+    hold = holds.get_hold(token)
+    if not hold or hold["user_id"] != request.user.id:
+        return Response({"error": "Удержание не найдено или истекло"}, status=404)
+    holds.release_hold(hold)
+    return Response(status=204)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def confirm_hold_view(request, token):
+    hold = holds.get_hold(token)
+    if not hold or hold["user_id"] != request.user.id:
+        return Response({"error": "Удержание не найдено или истекло"}, status=404)
+
+    try:
+        resource = Room_Resources.objects.get(pk=hold["resource_id"], is_active=True)
+    except Room_Resources.DoesNotExist:
+        return Response({"error": "Ресурс не найден или неактивен"}, status=404)
+
+    booking = confirm_hold(request.user, hold, resource)
+    return Response(BookingSerializer(booking).data, status=201)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def resource_holds(request, resource_id):
+    try:
+        start = _parse_moment(request.GET.get('starts_at'))
+        end = _parse_moment(request.GET.get('ends_at'))
+    except ValueError:
+        return Response(
+            {"error": "Параметры starts_at и ends_at обязательны (ISO 8601)"},
+            status=400
+        )
+
+    held = holds.active_holds(resource_id, start, end)
+    return Response({
+        "resource_id": resource_id,
+        "held_slots": [
+            {
+                "starts_at": held_start.isoformat(),
+                "ends_at": held_end.isoformat(),
+                "mine": user_id == request.user.id
+            }
+            for held_start, held_end, user_id in held
+        ]
+    })
+
+
+def _analytics_range(request):
+    """(first_day, last_day) from ?from=&to=, or raises ValueError with the error message."""
+    try:
+        first_day = _parse_date(request.GET.get('from', ''))
+        last_day = _parse_date(request.GET.get('to', ''))
+    except ValueError:
+        raise ValueError("Укажите from и to в формате YYYY-MM-DD")
+    if last_day < first_day:
+        raise ValueError("Дата to не может быть раньше from")
+    if (last_day - first_day).days >= analytics.MAX_RANGE_DAYS:
+        raise ValueError(f"Диапазон не может превышать {analytics.MAX_RANGE_DAYS} дней")
+    return first_day, last_day
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def resource_utilization(request):
+    """Booked hours / open hours, booking count and peak hour per resource."""
+    try:
+        first_day, last_day = _analytics_range(request)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    try:
+        open_from = int(request.GET.get('open_from', 0))
+        open_to = int(request.GET.get('open_to', 24))
+    except ValueError:
+        return Response({"error": "open_from и open_to должны быть целыми числами"}, status=400)
+    if not 0 <= open_from < open_to <= 24:
+        return Response({"error": "Часы работы должны удовлетворять 0 <= open_from < open_to <= 24"}, status=400)
+
+    return Response({
+        "from": first_day.isoformat(),
+        "to": last_day.isoformat(),
+        "open_from": open_from,
+        "open_to": open_to,
+        "resources": analytics.utilization(first_day, last_day, open_from, open_to),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def resource_daily_occupancy(request):
+    """Per resource and day booked minutes and booking counts, from the rollup table."""
+    try:
+        first_day, last_day = _analytics_range(request)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+    try:
+        resource_id = int(request.GET['resource']) if request.GET.get('resource') else None
+    except ValueError:
+        return Response({"error": "resource должен быть целым числом"}, status=400)
+
+    return Response({
+        "from": first_day.isoformat(),
+        "to": last_day.isoformat(),
+        "days": analytics.daily_occupancy(first_day, last_day, resource_id),
     })
@@ -0,0 +1,26 @@
+import pytest
+from django.core.cache import cache
+
+from bookings import audit, holds, occupancy
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Cached entries, occupancy bitmaps and slot holds must not leak between tests."""
+    cache.clear()
+    for client, pattern in (
+        (occupancy.r, 'occupancy:*'),
+        (holds.r, 'hold*'),
+        (holds.r, holds.PENDING_EXPIRY_KEY),
+        (audit.r, 'audit:*'),
+    ):
+        keys = list(client.scan_iter(pattern))
+        if keys:
+            client.delete(*keys)
+    yield
+
+
+@pytest.fixture(autouse=True)
+def sync_audit_log(settings):
+    """Write AuditLog rows in the request so tests can assert on them directly."""
+    settings.AUDIT_LOG_ASYNC = False
@@ -0,0 +1,12 @@
+"""
+Load testing for RoomTime.
+
+    python -m loadtest seed --users 200 --resources 50 --bookings 20000
+    python -m loadtest run --base-url http://127.0.0.1:8000 --duration 60 --workers 32
+
+seed writes a synthetic dataset through the ORM and a manifest (credentials,
+resource ids, the hot rooms and the contention day); run replays a weighted
+mix of login, resource list, availability polling and contended booking
+creation against a running server and prints a JSON report per endpoint.
+The runner only needs the standard library and the manifest.
+"""
@@ -0,0 +1,45 @@
+import argparse
+import sys
+
+from . import runner, seed
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m loadtest', description='RoomTime load testing')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seeding = commands.add_parser('seed', help='create a synthetic dataset and its manifest')
+    seeding.add_argument('--users', type=int, default=200)
+    seeding.add_argument('--resources', type=int, default=50)
+    seeding.add_argument('--bookings', type=int, default=20000)
+    seeding.add_argument('--days', type=int, default=60, help='span the bookings are spread over')
+    seeding.add_argument('--hot', type=int, default=3, help='rooms the runner books concurrently')
+    seeding.add_argument('--password', default='loadtest-pass-123')
+    seeding.add_argument('--seed', type=int, default=1)
+    seeding.add_argument('--flush', action='store_true', help='delete a previous load-test dataset first')
+    seeding.add_argument('--manifest', default='loadtest-manifest.json')
+
+    running = commands.add_parser('run', help='drive the request mix against a running server')
+    running.add_argument('--base-url', default='http://127.0.0.1:8000')
+    running.add_argument('--manifest', default='loadtest-manifest.json')
+    running.add_argument('--duration', type=float, default=60, help='seconds')
+    running.add_argument('--workers', type=int, default=16, help='concurrent virtual users')
+    running.add_argument('--mix', default=runner.DEFAULT_MIX, help='scenario=weight,...')
+    running.add_argument('--utc-offset', default='+05:00', help='offset of the contended slot times')
+    running.add_argument('--hold-ttl', type=float, default=15,
+                         help='BOOKING_PENDING_TTL_MINUTES of the server, for double-booking detection')
+    running.add_argument('--timeout', type=float, default=30)
+    running.add_argument('--seed', type=int, default=1)
+    running.add_argument('--out', help='also write the JSON report to this file')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == 'seed':
+        return seed.main(args)
+    return runner.main(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,288 @@
+"""
+Closed-loop load runner (standard library only).
+
+Each worker logs in as a seeded user, then picks scenarios by weight until
+the duration is up, one keep-alive connection per worker:
+
+    login         POST /api/users/login/
+    resources     GET  /api/rooms/resources/ (plain and filtered)
+    availability  GET  /api/bookings/resources/{id}/availability/, revalidated with If-None-Match
+    book          POST /api/bookings/ on a hot room at a contended slot
+
+A rejected booking (400) is the expected outcome of contention, not an
+error. Double bookings are counted from the accepted (201) bookings: any two
+that overlap on the same resource mean the server let a conflict through.
+"""
+import http.client
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, time as dt_time, timedelta
+from urllib.parse import urlencode, urlsplit
+
+SCENARIOS = ('login', 'resources', 'availability', 'book')
+DEFAULT_MIX = 'login=1,resources=5,availability=8,book=2'
+# Contended slots on the contention day: starts every 30 minutes from 09:00,
+# one hour long, so neighbours overlap as well as exact repeats.
+CONTENDED_STARTS = 16
+EXPECTED = {
+    'login': {200},
+    'resources': {200, 304},
+    'availability': {200, 304},
+    'book': {201, 400},
+}
+
+
+def parse_mix(text):
+    weights = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"unknown scenario {name!r}, expected one of {', '.join(SCENARIOS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def double_bookings(accepted, hold_seconds=None):
+    """
+    Overlapping pairs among accepted (resource_id, starts_at, ends_at, accepted_at)
+    bookings. Bookings are pending until confirmed, so with hold_seconds a pair
+    accepted further apart than that doesn't count: the first one may have
+    expired and freed its slot in between.
+    """
+    by_resource = defaultdict(list)
+    for resource_id, start, end, accepted_at in accepted:
+        by_resource[resource_id].append((start, end, accepted_at))
+    overlaps = 0
+    for intervals in by_resource.values():
+        intervals.sort()
+        for index, (start, end, accepted_at) in enumerate(intervals):
+            for other_start, _, other_accepted_at in intervals[index + 1:]:
+                if other_start >= end:
+                    break
+                if hold_seconds is None or abs(other_accepted_at - accepted_at) < hold_seconds:
+                    overlaps += 1
+    return overlaps
+
+
+class Recorder:
+    def __init__(self, hold_seconds=None):
+        self.hold_seconds = hold_seconds
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(list)
+        self.accepted = []
+
+    def add(self, endpoint, status, seconds, error=None):
+        with self.lock:
+            self.latencies[endpoint].append(seconds * 1000)
+            self.statuses[endpoint][status] += 1
+            if error and len(self.errors[endpoint]) < 5:
+                self.errors[endpoint].append(error)
+
+    def booked(self, resource_id, start, end):
+        with self.lock:
+            self.accepted.append((resource_id, start, end, time.monotonic()))
+
+    def report(self, elapsed):
+        endpoints = {}
+        for endpoint in SCENARIOS:
+            latencies = sorted(self.latencies.get(endpoint, ()))
+            if not latencies:
+                continue
+            statuses = self.statuses[endpoint]
+            unexpected = sum(count for status, count in statuses.items() if status not in EXPECTED[endpoint])
+            entry = {
+                'requests': len(latencies),
+                'throughput_rps': round(len(latencies) / elapsed, 2),
+                'errors': unexpected,
+                'throttled': statuses.get(429, 0),
+                'statuses': {str(status): count for status, count in sorted(statuses.items(), key=str)},
+                'latency_ms': {
+                    'p50': round(percentile(latencies, 0.50), 2),
+                    'p95': round(percentile(latencies, 0.95), 2),
+                    'p99': round(percentile(latencies, 0.99), 2),
+                    'mean': round(sum(latencies) / len(latencies), 2),
+                    'max': round(latencies[-1], 2),
+                },
+                'error_samples': self.errors.get(endpoint, []),
+            }
+            if endpoint == 'book':
+                entry['created'] = statuses.get(201, 0)
+                entry['conflicts'] = statuses.get(400, 0)
+                entry['double_bookings'] = double_bookings(self.accepted, self.hold_seconds)
+            endpoints[endpoint] = entry
+
+        total = sum(entry['requests'] for entry in endpoints.values())
+        return {
+            'duration_s': round(elapsed, 2),
+            'requests': total,
+            'throughput_rps': round(total / elapsed, 2) if elapsed else 0,
+            'errors': sum(entry['errors'] for entry in endpoints.values()),
+            'double_bookings': endpoints.get('book', {}).get('double_bookings', 0),
+            'endpoints': endpoints,
+        }
+
+
+class Client:
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.connection_class = (
+            http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        )
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.connection = None
+        self.token = None
+
+    def request(self, method, path, body=None, headers=None):
+        """(status, headers, parsed body). Reconnects once if the keep-alive connection dropped."""
+        headers = dict(headers or {})
+        headers['Accept'] = 'application/json'
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+
+        for attempt in (1, 2):
+            if self.connection is None:
+                self.connection = self.connection_class(self.netloc, timeout=self.timeout)
+            try:
+                self.connection.request(method, self.prefix + path, body=payload, headers=headers)
+                response = self.connection.getresponse()
+                raw = response.read()
+            except (ConnectionError, http.client.HTTPException):
+                self.connection.close()
+                self.connection = None
+                if attempt == 2:
+                    raise
+                continue
+            data = json.loads(raw) if raw and response.headers.get_content_type() == 'application/json' else None
+            return response.status, response.headers, data
+
+
+class Worker(threading.Thread):
+    def __init__(self, number, options, manifest, recorder, deadline):
+        super().__init__(name=f'loadtest-{number}', daemon=True)
+        self.rng = random.Random(options.seed * 1000 + number)
+        self.options = options
+        self.manifest = manifest
+        self.recorder = recorder
+        self.deadline = deadline
+        self.client = Client(options.base_url, options.timeout)
+        self.email = manifest['users'][number % len(manifest['users'])]
+        self.etags = {}
+        names, weights = zip(*options.weights.items())
+        self.names, self.weights = names, weights
+
+    def run(self):
+        self.login()
+        while time.monotonic() < self.deadline:
+            scenario = self.rng.choices(self.names, self.weights)[0]
+            if scenario != 'login' and self.client.token is None:
+                scenario = 'login'
+            getattr(self, scenario)()
+
+    def call(self, endpoint, method, path, body=None, headers=None):
+        started = time.perf_counter()
+        try:
+            status, response_headers, data = self.client.request(method, path, body, headers)
+        except Exception as exc:
+            self.recorder.add(endpoint, 'exception', time.perf_counter() - started, repr(exc))
+            return None, None, None
+        error = None
+        if status not in EXPECTED[endpoint]:
+            error = f'{status}: {json.dumps(data, ensure_ascii=False)[:200] if data is not None else ""}'
+        self.recorder.add(endpoint, status, time.perf_counter() - started, error)
+        return status, response_headers, data
+
+    def login(self):
+        self.client.token = None
+        status, _, data = self.call('login', 'POST', '/api/users/login/', {
+            'email': self.email, 'password': self.manifest['password'],
+        })
+        if status == 200:
+            self.client.token = data['access_token']
+
+    def resources(self):
+        query = {}
+        if self.rng.random() < 0.3:
+            query['capacity'] = self.rng.choice((4, 8, 12))
+        path = '/api/rooms/resources/' + (f'?{urlencode(query)}' if query else '')
+        self.conditional_get('resources', path)
+
+    def availability(self):
+        resource_id = self.rng.choice(
+            self.manifest['hot_resources'] if self.rng.random() < 0.5 else self.manifest['resources']
+        )
+        day = date.fromisoformat(self.manifest['contention_day'])
+        self.conditional_get(
+            'availability',
+            f'/api/bookings/resources/{resource_id}/availability/?date={day.isoformat()}',
+        )
+
+    def conditional_get(self, endpoint, path):
+        # Pollers keep the last ETag and revalidate, like a browser would.
+        headers = {'If-None-Match': self.etags[path]} if path in self.etags else None
+        status, response_headers, _ = self.call(endpoint, 'GET', path, headers=headers)
+        if status == 200 and response_headers.get('ETag'):
+            self.etags[path] = response_headers['ETag']
+
+    def book(self):
+        resource_id = self.rng.choice(self.manifest['hot_resources'])
+        day = date.fromisoformat(self.manifest['contention_day'])
+        start = datetime.combine(day, dt_time(9)) + timedelta(minutes=30 * self.rng.randrange(CONTENDED_STARTS))
+        end = start + timedelta(hours=1)
+        offset = self.options.utc_offset
+        status, _, _ = self.call('book', 'POST', '/api/bookings/', {
+            'resource': resource_id,
+            'starts_at': start.isoformat() + offset,
+            'ends_at': end.isoformat() + offset,
+        })
+        if status == 201:
+            self.recorder.booked(resource_id, start, end)
+
+
+def run(options, manifest):
+    recorder = Recorder(hold_seconds=options.hold_ttl * 60)
+    started = time.monotonic()
+    deadline = started + options.duration
+    workers = [Worker(number, options, manifest, recorder, deadline) for number in range(options.workers)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return recorder.report(time.monotonic() - started)
+
+
+def main(args):
+    with open(args.manifest) as source:
+        manifest = json.load(source)
+    args.weights = parse_mix(args.mix)
+    report = run(args, manifest)
+    report['options'] = {
+        'base_url': args.base_url, 'workers': args.workers, 'duration_s': args.duration,
+        'mix': args.weights, 'seed': args.seed,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as out:
+            out.write(text)
+    print(text)
+    return 1 if report['double_bookings'] else 0
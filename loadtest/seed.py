@@ -0,0 +1,114 @@
+"""
+Synthetic dataset for load tests.
+
+Bookings never overlap: every resource gets distinct one-hour slots drawn
+from the seeded span, which ends before the contention day the runner books
+on. Everything is derived from --seed, so two runs with the same arguments
+produce the same data.
+"""
+import json
+import os
+import random
+from datetime import timedelta
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'roomtime.settings')
+
+EMAIL_DOMAIN = 'loadtest.local'
+RESOURCE_PREFIX = 'Load room'
+BATCH_SIZE = 5000
+
+
+def _setup():
+    import django
+    django.setup()
+
+
+def flush():
+    """Delete rows left by a previous seed (bookings go with their users and resources)."""
+    from django.contrib.auth import get_user_model
+    from rooms.models import Room_Resources
+
+    get_user_model().objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').delete()
+    Room_Resources.objects.filter(name__startswith=RESOURCE_PREFIX).delete()
+
+
+def seed(users, resources, bookings, days, hot, password, seed_value):
+    """Create the dataset and return the manifest dict."""
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from django.utils import timezone
+
+    from bookings import rollup
+    from bookings.availability import day_bounds
+    from bookings.models import Booking
+    from rooms.models import Room_Resources
+
+    User = get_user_model()
+    rng = random.Random(seed_value)
+
+    # One hash for everyone: hashing per user would dominate the seed time.
+    hashed = make_password(password)
+    created_users = User.objects.bulk_create([
+        User(username=f'load{n}', email=f'load{n}@{EMAIL_DOMAIN}', password=hashed)
+        for n in range(users)
+    ], batch_size=BATCH_SIZE)
+
+    created_resources = Room_Resources.objects.bulk_create([
+        Room_Resources(
+            name=f'{RESOURCE_PREFIX} {n}',
+            location=f'Building {n % 5}, floor {n % 12}',
+            capacity=rng.choice((2, 4, 6, 8, 12, 20, 40)),
+        )
+        for n in range(resources)
+    ], batch_size=BATCH_SIZE)
+
+    first_day = timezone.localdate() - timedelta(days=days // 2)
+    span_start, _ = day_bounds(first_day)
+    slots = days * 24
+    per_resource = min(slots, bookings // max(resources, 1))
+
+    rows = []
+    for resource in created_resources:
+        for slot in rng.sample(range(slots), per_resource):
+            start = span_start + timedelta(hours=slot)
+            rows.append(Booking(
+                user=rng.choice(created_users),
+                resource=resource,
+                starts_at=start,
+                ends_at=start + timedelta(hours=1),
+                status=Booking.STATUS_CONFIRMED if rng.random() < 0.8 else Booking.STATUS_CANCELLED,
+            ))
+    Booking.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    rollup.repair(full=True)
+
+    return {
+        'seed': seed_value,
+        'password': password,
+        'users': [user.email for user in created_users],
+        'resources': [resource.id for resource in created_resources],
+        'hot_resources': [resource.id for resource in created_resources[:hot]],
+        'first_day': first_day.isoformat(),
+        'last_day': (first_day + timedelta(days=days - 1)).isoformat(),
+        # A free day after the seeded span, where the runner's hot-room bookings collide.
+        'contention_day': (first_day + timedelta(days=days + 1)).isoformat(),
+        'bookings': len(rows),
+    }
+
+
+def main(args):
+    _setup()
+    if args.flush:
+        flush()
+    manifest = seed(
+        users=args.users,
+        resources=args.resources,
+        bookings=args.bookings,
+        days=args.days,
+        hot=args.hot,
+        password=args.password,
+        seed_value=args.seed,
+    )
+    with open(args.manifest, 'w') as out:
+        json.dump(manifest, out, indent=2)
+    print(f"Seeded {len(manifest['users'])} users, {len(manifest['resources'])} resources, "
+          f"{manifest['bookings']} bookings; manifest written to {args.manifest}")
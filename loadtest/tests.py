@@ -0,0 +1,19 @@
+from datetime import datetime, timedelta, timezone
+
+from .runner import double_bookings, percentile
+
+
+def test_loadtest_report_counts_double_bookings():
+    start = datetime(2030, 1, 15, 9, tzinfo=timezone.utc)
+    hour = timedelta(hours=1)
+    accepted = [
+        (1, start, start + hour, 0.0),
+        (1, start + hour, start + 2 * hour, 1.0),       # adjacent, fine
+        (1, start + hour / 2, start + 3 * hour / 2, 2.0),  # overlaps both
+        (2, start, start + hour, 3.0),
+        (1, start, start + hour, 5000.0),               # after the first hold expired
+    ]
+    assert double_bookings(accepted) == 4
+    assert double_bookings(accepted, hold_seconds=900) == 2
+    assert percentile(list(range(1, 101)), 0.95) == 95
+    assert percentile([], 0.5) is None
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:38
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('rooms', '0001_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name='room_resources',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='room_resources_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='room_resources',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['location'], name='room_resources_location_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
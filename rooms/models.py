@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 
 class Room_Resources(models.Model):
@@ -6,6 +7,13 @@ class Room_Resources(models.Model):
     capacity = models.IntegerField()
     file_path = models.CharField(max_length=255, null=True, blank=True)
     is_active = models.BooleanField(default=True)
-    
+
+    class Meta:
+        # pg_trgm indexes for similarity search on name and location.
+        indexes = [
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='room_resources_name_trgm'),
+            GinIndex(fields=['location'], opclasses=['gin_trgm_ops'], name='room_resources_location_trgm'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.location})"
\ No newline at end of file
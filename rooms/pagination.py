@@ -0,0 +1,10 @@
+from rest_framework.pagination import LimitOffsetPagination
+
+
+class ResourcePagination(LimitOffsetPagination):
+    """
+    Opt-in paging for the resource catalog: without ?limit the list is
+    returned whole, as before; with it, a count/next/previous/results page.
+    """
+    default_limit = None
+    max_limit = 500
@@ -1,3 +1,7 @@
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Q
+from django.db.models.functions import Greatest
+
 from rooms.models import Room_Resources
 
 
@@ -19,11 +23,38 @@ def filter_by_active(queryset, is_active):
     return queryset.filter(is_active=is_active)
 
 
+def normalize_location(location):
+    """
+    Canonical location filter value. filter_by_location is case-insensitive,
+    so lowercasing doesn't change its result; keep the two in step, since the
+    cached catalog is keyed by this value.
+    """
+    return (location or '').strip().lower()
+
+
 def filter_by_location(queryset, location):
-    """Filter resources by location (case-insensitive)."""
+    """Filter resources by location substring (case-insensitive; ILIKE uses the trigram index)."""
     return queryset.filter(location__icontains=location)
 
 
+def normalize_search(term):
+    """Canonical search term; trigram similarity ignores case (see normalize_location)."""
+    return (term or '').strip().lower()
+
+
+def search_resources(queryset, term):
+    """Resources whose name or location resembles term, most relevant first."""
+    return (
+        queryset
+        .filter(Q(name__trigram_word_similar=term) | Q(location__trigram_word_similar=term))
+        .annotate(relevance=Greatest(
+            TrigramWordSimilarity(term, 'name'),
+            TrigramWordSimilarity(term, 'location'),
+        ))
+        .order_by('-relevance', 'id')
+    )
+
+
 def filter_by_capacity(queryset, min_capacity):
     """Filter resources by minimum capacity."""
     return queryset.filter(capacity__gte=min_capacity)
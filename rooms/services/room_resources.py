@@ -1,29 +1,88 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db import transaction
+
+from roomtime import conditional
+
 from ..repositories import room_resources as repo
 
+CATALOG_VERSION_KEY = "rooms:catalog:version"
+CATALOG_CACHE_TIMEOUT = 60 * 60
+
+
+def bump_catalog_version():
+    """Invalidate ETags of everything that renders resource data."""
+    transaction.on_commit(lambda: conditional.bump(CATALOG_VERSION_KEY))
+
 
 def get_filtered_resources(request):
     """Get filtered list of room resources based on query parameters."""
-    queryset = repo.get_all_resources()
-    
-    # Parse and apply is_active filter
-    is_active_param = request.query_params.get('is_active')
-    queryset = _apply_active_filter(queryset, is_active_param)
-    
-    # Apply location filter
-    location = request.query_params.get('location')
-    if location:
-        queryset = repo.filter_by_location(queryset, location)
-    
-    # Apply capacity filter≈
-    capacity_param = request.query_params.get('capacity')
+    return filter_resources(catalog_filters(request.query_params))
+
+
+def catalog_filters(query_params):
+    """
+    Canonical form of the list filters, so that query strings selecting the
+    same resources (?is_active=1 and ?is_active=yes, "Floor 2" and "floor 2 ")
+    share one cached catalog.
+    """
+    capacity = None
+    capacity_param = query_params.get('capacity')
     if capacity_param:
         try:
             capacity = int(capacity_param)
-            queryset = repo.filter_by_capacity(queryset, capacity)
         except (TypeError, ValueError):
             pass  # Invalid capacity, skip filter
-    
-    return queryset
+
+    return {
+        'is_active': _parse_active(query_params.get('is_active')),
+        'location': repo.normalize_location(query_params.get('location')),
+        'search': repo.normalize_search(query_params.get('search')),
+        'capacity': capacity,
+    }
+
+
+def filter_resources(filters):
+    """Resources matching catalog_filters() output."""
+    queryset = repo.get_all_resources()
+
+    if filters['is_active'] is not None:
+        queryset = repo.filter_by_active(queryset, filters['is_active'])
+
+    if filters['location']:
+        queryset = repo.filter_by_location(queryset, filters['location'])
+
+    if filters['capacity'] is not None:
+        queryset = repo.filter_by_capacity(queryset, filters['capacity'])
+
+    # Ranked search orders by relevance; otherwise keep a stable order for paging
+    if filters['search']:
+        return repo.search_resources(queryset, filters['search'])
+    return queryset.order_by('id')
+
+
+def cached_catalog(request, filters, render):
+    """
+    Rendered catalog bytes for filters, from the cache when possible.
+
+    The key embeds the catalog version, so add/edit/remove_resource make every
+    cached variant unreachable at once; stale entries just expire. render() is
+    called on a miss. Pages (?limit/offset) carry absolute next/previous links,
+    so their key also covers the full request URI.
+    """
+    (version,), _ = conditional.read_versions(CATALOG_VERSION_KEY)
+    parts = [version, sorted(filters.items())]
+    if 'limit' in request.query_params:
+        parts.append(request.build_absolute_uri())
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    key = f"rooms:catalog:{digest}"
+
+    body = cache.get(key)
+    if body is None:
+        body = render()
+        cache.set(key, body, timeout=CATALOG_CACHE_TIMEOUT)
+    return body
 
 
 def get_resource(resource_id):
@@ -33,7 +92,9 @@ def get_resource(resource_id):
 
 def add_resource(validated_data):
     """Create new room resource."""
-    return repo.create_resource(validated_data)
+    resource = repo.create_resource(validated_data)
+    bump_catalog_version()
+    return resource
 
 
 def edit_resource(resource_id, validated_data):
@@ -41,6 +102,7 @@ def edit_resource(resource_id, validated_data):
     resource = repo.get_resource(resource_id)
     if resource:
         updated = repo.update_resource(resource, validated_data)
+        bump_catalog_version()
         return updated
     return None
 
@@ -50,21 +112,22 @@ def remove_resource(resource_id):
     resource = repo.get_resource(resource_id)
     if resource:
         repo.delete_resource(resource)
+        bump_catalog_version()
         return True
     return False
 
 
-def _apply_active_filter(queryset, is_active_param):
-    """Apply active status filter. Defaults to True if not specified."""
+def _parse_active(is_active_param):
+    """True/False for the active filter, None for "all". Defaults to True if not specified."""
     if is_active_param is None:
         # Default: show only active resources
-        return repo.filter_by_active(queryset, True)
-    
+        return True
+
     # Parse boolean values
     val = is_active_param.strip().lower()
     if val in ('true', '1', 'yes', 'y'):
-        return repo.filter_by_active(queryset, True)
+        return True
     elif val in ('false', '0', 'no', 'n'):
-        return repo.filter_by_active(queryset, False)
-    
-    return queryset
+        return False
+
+    return None
@@ -193,3 +193,63 @@
 
 #         response = api_client.delete(url)
 #         assert response.status_code in (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN)
+
+
+import json
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from rooms.models import Room_Resources
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_resource_location_filter_matches_substrings():
+    Room_Resources.objects.create(name='Loc A', location='Floor 2, East', capacity=4)
+    Room_Resources.objects.create(name='Loc B', location='Basement', capacity=4)
+    client = APIClient()
+
+    def names(location):
+        response = client.get('/api/rooms/resources/', {'location': location})
+        return [row['name'] for row in json.loads(response.content)]
+
+    assert names('fl') == ['Loc A']
+    assert names('2') == ['Loc A']
+    # Similar is not enough: the filter keeps substring semantics.
+    assert names('Flor') == []
+
+
+@pytest.mark.django_db
+def test_resource_catalog_served_from_cache_until_edited(django_capture_on_commit_callbacks):
+    admin = User.objects.create_user(username='test24', email='test24@example.com', password='pass123', is_staff=True)
+    first = Room_Resources.objects.create(name='Catalog A', location='Floor 9', capacity=4)
+    Room_Resources.objects.create(name='Catalog B', location='Floor 9', capacity=8)
+    client = APIClient()
+
+    listed = client.get('/api/rooms/resources/', {'location': 'Floor 9'})
+    assert listed.status_code == 200
+    assert [row['name'] for row in json.loads(listed.content)] == ['Catalog A', 'Catalog B']
+
+    # Same filters spelled differently: no queries, identical bytes
+    with CaptureQueriesContext(connection) as ctx:
+        again = client.get('/api/rooms/resources/', {'location': ' floor 9', 'is_active': 'yes'})
+    assert len(ctx.captured_queries) == 0
+    assert again.content == listed.content
+
+    page = client.get('/api/rooms/resources/', {'location': 'Floor 9', 'limit': 1, 'offset': 1})
+    data = json.loads(page.content)
+    assert data['count'] == 2
+    assert [row['name'] for row in data['results']] == ['Catalog B']
+    assert data['next'] is None and data['previous'] is not None
+
+    client.force_authenticate(user=admin)
+    with django_capture_on_commit_callbacks(execute=True):
+        assert client.put(f'/api/rooms/resources/{first.id}/', {'name': 'Catalog A2'}, format='json').status_code == 200
+    client.force_authenticate(user=None)
+    edited = client.get('/api/rooms/resources/', {'location': 'Floor 9'})
+    assert [row['name'] for row in json.loads(edited.content)] == ['Catalog A2', 'Catalog B']
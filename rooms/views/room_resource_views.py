@@ -1,4 +1,7 @@
 from rest_framework import viewsets, permissions, status
+from django.http import HttpResponse
+from django.utils.decorators import method_decorator
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
@@ -9,8 +12,19 @@ from ..serializers.room_resources import (
     ResourceListSerializer, 
     ResourceCreateUpdateSerializer
 )
+from roomtime.conditional import conditional
+from roomtime.serialization import ValuesSerializer
+
+from ..pagination import ResourcePagination
 from ..services import room_resources as resource_service
 
+resource_rows = ValuesSerializer(ResourceListSerializer)
+
+
+def catalog_version_keys(request, *args, **kwargs):
+    return [resource_service.CATALOG_VERSION_KEY]
+
+
 error_responses = {
     400: "Bad Request",
     401: "Unauthorized",
@@ -36,21 +50,45 @@ class RoomResourceViewSet(viewsets.ViewSet):
         manual_parameters=[
             openapi.Parameter('is_active', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN, default=True),
             openapi.Parameter('location', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter('search', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="Fuzzy search by name or location, most relevant first"),
             openapi.Parameter('capacity', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description="Page size; without it the whole list is returned"),
+            openapi.Parameter('offset', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
         ],
         # 👇 Используем легкий сериализатор для списка
         responses={200: ResourceListSerializer(many=True)}
     )
+    @method_decorator(conditional(catalog_version_keys))
     def list(self, request):
-        resources = resource_service.get_filtered_resources(request)
-        serializer = ResourceListSerializer(resources, many=True) # <-- Тут тоже меняем
-        return Response(serializer.data)
+        filters = resource_service.catalog_filters(request.query_params)
+
+        def payload():
+            # values() rows formatted like ResourceListSerializer, without model instances
+            resources = resource_rows.values(resource_service.filter_resources(filters))
+            paginator = ResourcePagination()
+            page = paginator.paginate_queryset(resources, request, view=self)
+            if page is None:
+                return resource_rows.many(resources)
+            return paginator.get_paginated_response(resource_rows.many(page)).data
+
+        # Browsable API, ?format=... and Accept parameters (indent) go through DRF as usual
+        if request.accepted_media_type != JSONRenderer.media_type:
+            return Response(payload())
+
+        # Hot path: ready-to-send JSON bytes straight from the cache
+        body = resource_service.cached_catalog(
+            request, filters, lambda: request.accepted_renderer.render(payload())
+        )
+        return HttpResponse(body, content_type='application/json')
     
     @swagger_auto_schema(
         tags=["Resources"],
         operation_summary="Retrieve a resource",
         responses={200: ResourceSerializer(), 404: "Not Found"}
     )
+    @method_decorator(conditional(catalog_version_keys))
     def retrieve(self, request, pk=None):
         resource = resource_service.get_resource(pk)
         if resource:
@@ -12,6 +12,29 @@ app.conf.task_routes = {
 "bookings.tasks.*": {"queue": "bookings"},
 "notifications.tasks.*": {"queue": "notifications"},
 }
+app.conf.beat_schedule = {
+    "release-expired-holds": {
+        "task": "bookings.tasks.release_holds",
+        "schedule": 30.0,
+    },
+    "flush-audit-log": {
+        "task": "bookings.tasks.flush_audit_log",
+        "schedule": 5.0,
+    },
+    "repair-occupancy-rollup": {
+        "task": "bookings.tasks.repair_occupancy_rollup",
+        "schedule": 10 * 60.0,
+    },
+    "rebuild-occupancy-rollup": {
+        "task": "bookings.tasks.repair_occupancy_rollup",
+        "schedule": 24 * 60 * 60.0,
+        "kwargs": {"full": True},
+    },
+    "maintain-audit-partitions": {
+        "task": "bookings.tasks.maintain_audit_partitions",
+        "schedule": 24 * 60 * 60.0,
+    },
+}
 app.conf.broker_connection_retry_on_startup = True
 app.conf.task_default_retry_delay = 10
 app.conf.task_annotations = {
@@ -0,0 +1,94 @@
+"""
+Version counters and conditional GET.
+
+Writers bump a counter in the cache whenever the data behind a response
+changes; readers derive the ETag and Last-Modified of that response from the
+counters alone. conditional() answers a matching If-None-Match or
+If-Modified-Since with 304 before the view body (and its queries) runs.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+def _modified_key(key):
+    return f"{key}:modified"
+
+
+def _fresh_version():
+    # Used when a counter is missing (first use or eviction): a value that
+    # can't collide with an older counter, so no stale entry is ever reused.
+    return int(time.time() * 1000)
+
+
+def read_versions(*keys):
+    """
+    Current value of every counter and the time of the latest bump, in one
+    cache round trip. Missing counters are created; a missing timestamp
+    counts as "modified now".
+    """
+    wanted = list(keys) + [_modified_key(key) for key in keys]
+    found = cache.get_many(wanted)
+    now = int(time.time())
+
+    versions = []
+    modified = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            cache.add(key, _fresh_version(), timeout=None)
+            version = cache.get(key)
+        versions.append(version)
+        if _modified_key(key) not in found:
+            cache.add(_modified_key(key), now, timeout=None)
+        modified.append(found.get(_modified_key(key), now))
+    return versions, max(modified)
+
+
+def bump(*keys):
+    """Invalidate everything derived from the given counters."""
+    now = int(time.time())
+    for key in set(keys):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_version(), timeout=None)
+        cache.set(_modified_key(key), now, timeout=None)
+
+
+def etag(*parts):
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'W/"{digest}"'
+
+
+def conditional(version_keys):
+    """
+    Decorator for GET views. version_keys(request, *args, **kwargs) returns the
+    cache keys of the counters the response depends on; the ETag also covers
+    the query string and the negotiated media type.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            versions, last_modified = read_versions(*version_keys(request, *args, **kwargs))
+            tag = etag(
+                versions,
+                request.path,
+                sorted(request.GET.lists()),
+                getattr(request, 'accepted_media_type', None),
+            )
+            response = get_conditional_response(request, etag=tag, last_modified=last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response.headers['ETag'] = tag
+                response.headers['Last-Modified'] = http_date(last_modified)
+                # Let clients keep the body but revalidate every time.
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapped
+    return decorator
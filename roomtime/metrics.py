@@ -0,0 +1,185 @@
+"""
+Per-request instrumentation and the Prometheus /metrics endpoint.
+
+MetricsMiddleware times every request and, through a DB execute_wrapper and
+the Redis client classes below, counts the SQL queries and Redis commands it
+issues. Everything is observed per resolved URL name (e.g. "bookings-list",
+"resource-availability", "login"), so label cardinality is bounded by the
+URLconf; unresolved paths are grouped under "unresolved".
+
+Outside a request (Celery, management commands) the wrappers only pass
+calls through. With METRICS_SERVER_TIMING the same numbers are added to the
+response as a Server-Timing header. Under gunicorn with several workers, set
+PROMETHEUS_MULTIPROC_DIR so /metrics aggregates all of them. /metrics only
+answers clients whose address is in METRICS_ALLOWED_IPS (addresses or CIDR
+networks); everyone else gets a 404.
+"""
+import ipaddress
+import os
+from contextlib import ExitStack
+from contextvars import ContextVar
+from time import perf_counter
+
+import redis
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+)
+
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+SIZE_BUCKETS = (100, 500, 1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000)
+
+REQUESTS = Counter(
+    'roomtime_requests_total', 'HTTP requests', ['view', 'method', 'status']
+)
+LATENCY = Histogram(
+    'roomtime_request_duration_seconds', 'Request latency', ['view', 'method']
+)
+DB_QUERIES = Histogram(
+    'roomtime_request_db_queries', 'SQL queries per request', ['view'], buckets=COUNT_BUCKETS
+)
+DB_TIME = Histogram(
+    'roomtime_request_db_seconds', 'Time spent in SQL per request', ['view']
+)
+REDIS_COMMANDS = Histogram(
+    'roomtime_request_redis_commands', 'Redis commands per request', ['view'], buckets=COUNT_BUCKETS
+)
+REDIS_TIME = Histogram(
+    'roomtime_request_redis_seconds', 'Time spent in Redis per request', ['view']
+)
+RESPONSE_SIZE = Histogram(
+    'roomtime_response_size_bytes', 'Response body size', ['view'], buckets=SIZE_BUCKETS
+)
+
+
+class RequestStats:
+    __slots__ = ('db_queries', 'db_seconds', 'redis_commands', 'redis_seconds')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.redis_commands = 0
+        self.redis_seconds = 0.0
+
+
+_current = ContextVar('roomtime_request_stats', default=None)
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_queries += 1
+        stats.db_seconds += perf_counter() - started
+
+
+def _timed_redis(commands, call, *args, **kwargs):
+    stats = _current.get()
+    if stats is None:
+        return call(*args, **kwargs)
+    started = perf_counter()
+    try:
+        return call(*args, **kwargs)
+    finally:
+        stats.redis_commands += commands
+        stats.redis_seconds += perf_counter() - started
+
+
+class InstrumentedPipeline(redis.client.Pipeline):
+    def execute(self, raise_on_error=True):
+        # The whole pipeline is one round trip; count the commands in it.
+        return _timed_redis(len(self.command_stack), super().execute, raise_on_error)
+
+    def immediate_execute_command(self, *args, **options):
+        return _timed_redis(1, super().immediate_execute_command, *args, **options)
+
+
+class InstrumentedRedis(redis.Redis):
+    """redis.Redis that reports to the current request. Also django-redis' REDIS_CLIENT_CLASS."""
+
+    def execute_command(self, *args, **options):
+        return _timed_redis(1, super().execute_command, *args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None and match.view_name else 'unresolved'
+
+
+def _response_size(response):
+    if response.streaming:
+        length = response.get('Content-Length')
+        return int(length) if length and length.isdigit() else None
+    return len(response.content)
+
+
+def _server_timing(total, stats):
+    return (
+        f'app;dur={total * 1000:.1f}, '
+        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.db_queries} queries", '
+        f'redis;dur={stats.redis_seconds * 1000:.1f};desc="{stats.redis_commands} commands"'
+    )
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED or request.path == settings.METRICS_PATH:
+            return self.get_response(request)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(_db_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = perf_counter() - started
+
+        view = _view_name(request)
+        REQUESTS.labels(view, request.method, response.status_code).inc()
+        LATENCY.labels(view, request.method).observe(total)
+        DB_QUERIES.labels(view).observe(stats.db_queries)
+        DB_TIME.labels(view).observe(stats.db_seconds)
+        REDIS_COMMANDS.labels(view).observe(stats.redis_commands)
+        REDIS_TIME.labels(view).observe(stats.redis_seconds)
+        size = _response_size(response)
+        if size is not None:
+            RESPONSE_SIZE.labels(view).observe(size)
+
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = _server_timing(total, stats)
+        return response
+
+
+def _scraper_allowed(address):
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(allowed, strict=False) for allowed in settings.METRICS_ALLOWED_IPS)
+
+
+def metrics_view(request):
+    if not settings.METRICS_ENABLED or not _scraper_allowed(request.META.get('REMOTE_ADDR', '')):
+        raise Http404
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,131 @@
+"""
+Read-only fast path for list serializers.
+
+A ModelSerializer builds a model instance per row and walks its bound fields
+one by one. ValuesSerializer takes the same serializer class, fetches only
+its fields with queryset.values() and formats each row with converters
+compiled once from the serializer's own fields, so the output is identical
+to serializer_class(rows, many=True).data.
+
+Only plain model-backed fields are supported (integers, strings, choices,
+booleans, primary-key relations and ISO 8601 datetimes); anything else is
+rejected when the converters are first compiled.
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, fields, relations
+from rest_framework.settings import api_settings
+
+
+def _identity(value):
+    return value
+
+
+def _boolean(field):
+    if field.allow_null:
+        return field.to_representation
+    return bool
+
+
+def _choice(field):
+    choices = field.choice_strings_to_values
+
+    def convert(value):
+        if value == '':
+            return value
+        return choices.get(str(value), value)
+    return convert
+
+
+def _datetime(field, tz):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601 or hasattr(field, 'timezone'):
+        return field.to_representation
+
+    def convert(value):
+        if tz is None or timezone.is_naive(value):
+            return field.to_representation(value)
+        value = value.astimezone(tz).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+def _primary_key(field):
+    if field.pk_field is not None:
+        return field.pk_field.to_representation
+    return _identity
+
+
+# Most specific first: ChoiceField before CharField-like lookups.
+CONVERTERS = [
+    (fields.ChoiceField, _choice),
+    (fields.BooleanField, _boolean),
+    (fields.IntegerField, lambda field: int),
+    (fields.CharField, lambda field: str),
+    (relations.PrimaryKeyRelatedField, _primary_key),
+]
+
+
+class ValuesSerializer:
+    """
+    ValuesSerializer(BookingSerializer).many(queryset) == BookingSerializer(queryset, many=True).data
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._fields = None
+        self._plans = {}
+
+    @property
+    def fields(self):
+        if self._fields is None:
+            readable = [field for field in self.serializer_class().fields.values() if not field.write_only]
+            for field in readable:
+                if '.' in field.source or field.source == '*':
+                    raise ImproperlyConfigured(
+                        f"{self.serializer_class.__name__}.{field.field_name}: "
+                        f"source {field.source!r} can't be read with values()"
+                    )
+            self._fields = readable
+        return self._fields
+
+    def values(self, queryset):
+        """
+        queryset.values() with the serializer's sources. Annotations are kept
+        too, so pagination can still read e.g. the relevance it orders by.
+        """
+        sources = [field.source for field in self.fields]
+        extra = [name for name in queryset.query.annotations if name not in sources]
+        return queryset.values(*sources, *extra)
+
+    def _plan(self, tz):
+        plan = self._plans.get(tz)
+        if plan is None:
+            plan = [(field.field_name, field.source, self._converter(field, tz)) for field in self.fields]
+            self._plans[tz] = plan
+        return plan
+
+    def _converter(self, field, tz):
+        if isinstance(field, fields.DateTimeField):
+            return _datetime(field, tz)
+        for field_class, factory in CONVERTERS:
+            if isinstance(field, field_class):
+                return factory(field)
+        raise ImproperlyConfigured(
+            f"{self.serializer_class.__name__}.{field.field_name}: "
+            f"{type(field).__name__} has no values() converter"
+        )
+
+    def many(self, rows):
+        """Representations of values() rows (dicts), in order."""
+        plan = self._plan(timezone.get_current_timezone() if settings.USE_TZ else None)
+        return [
+            {
+                name: None if (value := row[source]) is None else convert(value)
+                for name, source, convert in plan
+            }
+            for row in rows
+        ]
@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'users',
     'rooms',
     'bookings',
@@ -59,6 +60,7 @@ SPECTACULAR_SETTINGS = {
 }
 
 MIDDLEWARE = [
+    'roomtime.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -146,6 +148,17 @@ AUTH_USER_MODEL = 'users.User'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 
+# Prometheus metrics (roomtime.metrics); keep METRICS_PATH off the public proxy.
+METRICS_ENABLED = env.bool("METRICS_ENABLED", default=True)
+METRICS_PATH = "/metrics"
+# Scrapers allowed to read METRICS_PATH (addresses or CIDR networks, matched against REMOTE_ADDR).
+METRICS_ALLOWED_IPS = env.list("METRICS_ALLOWED_IPS", default=["127.0.0.1", "::1"])
+# Adds Server-Timing (app/db/redis durations) to every response.
+METRICS_SERVER_TIMING = env.bool("METRICS_SERVER_TIMING", default=False)
+
+# orjson renderer/parser (roomtime.renderers); False falls back to DRF's stock JSON.
+FAST_JSON = env.bool("FAST_JSON", default=True)
+
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.IsAuthenticated"],
     "DEFAULT_AUTHENTICATION_CLASSES": (
@@ -156,15 +169,25 @@ REST_FRAMEWORK = {
         "rest_framework.throttling.AnonRateThrottle",
         "rest_framework.throttling.UserRateThrottle",
     ],
+    # Overridable so load tests (python -m loadtest) aren't throttled.
     "DEFAULT_THROTTLE_RATES": {
-        "anon": "5/min",
-        "user": "10/min",
-        "login": "5/min",
-        "forgot": "3/min",
+        "anon": env("THROTTLE_RATE_ANON", default="5/min"),
+        "user": env("THROTTLE_RATE_USER", default="10/min"),
+        "login": env("THROTTLE_RATE_LOGIN", default="5/min"),
+        "forgot": env("THROTTLE_RATE_FORGOT", default="3/min"),
     },
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 3,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    "DEFAULT_RENDERER_CLASSES": [
+        "roomtime.renderers.ORJSONRenderer" if FAST_JSON else "rest_framework.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "roomtime.renderers.ORJSONParser" if FAST_JSON else "rest_framework.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 
@@ -201,6 +224,27 @@ SWAGGER_SETTINGS = {
 REDIS_URL = env('REDIS_URL')
 CACHE_URL = env('CACHE_URL')
 
+# Redis bitmap occupancy index (bookings.occupancy). Writes always keep it up
+# to date; reads only use it once it has been built with rebuild_occupancy.
+OCCUPANCY_INDEX_ENABLED = env.bool('OCCUPANCY_INDEX_ENABLED', default=False)
+
+# How long a slot hold (bookings.holds) stays reserved before it expires.
+BOOKING_HOLD_TTL_SECONDS = env.int('BOOKING_HOLD_TTL_SECONDS', default=600)
+# Pending bookings left unconfirmed for this long are cancelled by
+# bookings.tasks.release_holds.
+BOOKING_PENDING_TTL_MINUTES = env.int('BOOKING_PENDING_TTL_MINUTES', default=15)
+
+# Queue audit events in Redis and let bookings.tasks.flush_audit_log insert
+# them in batches. Disable to write AuditLog rows inside the request.
+AUDIT_LOG_ASYNC = env.bool('AUDIT_LOG_ASYNC', default=True)
+# AuditLog is partitioned by month; bookings.tasks.maintain_audit_partitions
+# keeps this many months created ahead and archives older ones to gzip CSV
+# files under UPLOADS_ROOT/audit before dropping them.
+AUDIT_LOG_RETENTION_MONTHS = env.int('AUDIT_LOG_RETENTION_MONTHS', default=12)
+AUDIT_LOG_PARTITIONS_AHEAD = env.int('AUDIT_LOG_PARTITIONS_AHEAD', default=3)
+
+UPLOADS_ROOT = Path(env('UPLOADS_ROOT', default=str(BASE_DIR / 'uploads')))
+
 CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = REDIS_URL
 
@@ -215,6 +259,7 @@ CACHES = {
         "LOCATION": CACHE_URL,
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            "REDIS_CLIENT_CLASS": "roomtime.metrics.InstrumentedRedis",
         }
     }
 }
\ No newline at end of file
@@ -0,0 +1,99 @@
+import json
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from bookings.availability import day_bounds
+from bookings.models import Booking
+from bookings.serializers import BookingSerializer
+from rooms.models import Room_Resources
+from roomtime.renderers import ORJSONRenderer
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_availability_answers_304_from_version_counters(django_capture_on_commit_callbacks):
+    user = User.objects.create_user(username='test23', email='test23@example.com', password='pass123')
+    resource = Room_Resources.objects.create(name='Room U', location='Location U', capacity=4)
+    day = timezone.localdate() + timedelta(days=22)
+    url = f'/api/bookings/resources/{resource.id}/availability/'
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    first = client.get(url, {'date': day.isoformat()})
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    with CaptureQueriesContext(connection) as ctx:
+        cached = client.get(url, {'date': day.isoformat()}, HTTP_IF_NONE_MATCH=etag)
+    assert cached.status_code == 304
+    assert len(ctx.captured_queries) == 0
+    assert client.get(url, {'date': (day + timedelta(days=1)).isoformat()}, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    day_start, _ = day_bounds(day)
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post('/api/bookings/', {
+            "resource": resource.id,
+            "starts_at": (day_start + timedelta(hours=10)).isoformat(),
+            "ends_at": (day_start + timedelta(hours=11)).isoformat(),
+        }, format='json')
+    changed = client.get(url, {'date': day.isoformat()}, HTTP_IF_NONE_MATCH=etag)
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_booking_list_fast_path_matches_serializer():
+    user = User.objects.create_user(username='test25', email='test25@example.com', password='pass123')
+    resource = Room_Resources.objects.create(name='Room V', location='Location V', capacity=4)
+    start = timezone.now().replace(microsecond=0) + timedelta(days=40)
+    Booking.objects.bulk_create([
+        Booking(user=user, resource=resource, starts_at=start + timedelta(hours=n),
+                ends_at=start + timedelta(hours=n, minutes=30), status=('pending', 'confirmed')[n % 2])
+        for n in range(5)
+    ])
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    response = client.get('/api/bookings/', {'mine': 1})
+    assert response.status_code == 200
+    expected = BookingSerializer(Booking.objects.filter(user=user).order_by('-starts_at', '-id'), many=True).data
+    assert json.loads(response.content)['results'] == expected
+
+
+def test_orjson_renderer_matches_stock_renderer():
+    data = {
+        'results': [{'id': 1, 'name': 'Зал A', 'at': timezone.now(), 'day': timezone.localdate()}],
+        'count': 2 ** 70,
+        'next': None,
+    }
+    for media_type in (None, 'application/json; indent=2', 'application/json; indent=4'):
+        assert ORJSONRenderer().render(data, media_type) == JSONRenderer().render(data, media_type)
+
+
+@pytest.mark.django_db
+def test_metrics_record_queries_per_view(settings):
+    settings.METRICS_SERVER_TIMING = True
+    Room_Resources.objects.create(name='Room M', location='Location M', capacity=3)
+    client = APIClient()
+
+    response = client.get('/api/rooms/resources/', {'capacity': 3})
+    assert response.status_code == 200
+    timing = response.headers['Server-Timing']
+    assert timing.startswith('app;dur=') and 'db;dur=' in timing and 'redis;dur=' in timing
+
+    metrics = client.get('/metrics').content.decode()
+    assert 'roomtime_request_db_queries_count{view="resource-list"}' in metrics
+    assert 'roomtime_requests_total{method="GET",status="200",view="resource-list"}' in metrics
+
+    assert client.get('/metrics', REMOTE_ADDR='203.0.113.7').status_code == 404
+    settings.METRICS_ALLOWED_IPS = ['10.0.0.0/8']
+    assert client.get('/metrics', REMOTE_ADDR='10.1.2.3').status_code == 200
+    assert client.get('/metrics').status_code == 404
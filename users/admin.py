@@ -15,6 +15,7 @@ class RefreshTokenAdmin(admin.ModelAdmin):
     list_display = ("user", "token", "expires_at", "revoked")
     search_fields = ("token", "user__email")
     list_filter = ("revoked",)
+    list_select_related = ("user",)
     ordering = ("-expires_at",)
 
 
@@ -23,4 +24,5 @@ class PasswordResetTokenAdmin(admin.ModelAdmin):
     list_display = ("user", "token", "used", "created_at", "expires_at")
     search_fields = ("token", "user__email")
     list_filter = ("used",)
+    list_select_related = ("user",)
     ordering = ("-created_at",)
\ No newline at end of file
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:38
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0002_passwordresettoken'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['email'], name='users_user_email_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
@@ -15,6 +16,12 @@ class User(AbstractUser):
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
+
+    class Meta(AbstractUser.Meta):
+        # pg_trgm index for booking search by email.
+        indexes = [
+            GinIndex(fields=['email'], opclasses=['gin_trgm_ops'], name='users_user_email_trgm'),
+        ]
     
     def __str__(self):
         return f"{self.email} - {self.role}"
@@ -27,7 +34,7 @@ class RefreshToken(models.Model):
     revoked = models.BooleanField(default=False)
     
     def __str__(self):
-        return f"Token for {self.user.email} (revoked={self.revoked})"
+        return f"Token for user {self.user_id} (revoked={self.revoked})"
     
 
 class PasswordResetToken(models.Model):
@@ -38,4 +45,4 @@ class PasswordResetToken(models.Model):
     expires_at = models.DateTimeField()
 
     def __str__(self):
-        return f"ResetToken for {self.user.email} (used={self.used})"
\ No newline at end of file
+        return f"ResetToken for user {self.user_id} (used={self.used})"
\ No newline at end of file
@@ -8,6 +8,8 @@ class RegisterSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ("email", "username", "password")
+        # validate_email checks uniqueness; the default UniqueValidator would repeat the query.
+        extra_kwargs = {"email": {"validators": []}}
 
     def validate_email(self, value):
         if User.objects.filter(email=value).exists():
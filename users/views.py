@@ -58,18 +58,8 @@ class LoginView(APIView):
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        email = serializer.validated_data["email"]
-        password = serializer.validated_data["password"]
-
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
-            logger.warning(f"Failed login attempt for {email}")
-            return Response({"detail": "Invalid credentials."}, status=401)
-
-        if not user.check_password(password):
-            logger.warning(f"Failed login attempt for {email}")
-            return Response({"detail": "Invalid credentials."}, status=401)
+        # LoginSerializer has already authenticated: no second lookup and password hash.
+        user = serializer.validated_data["user"]
 
         access = make_access_token(user)
         refresh = make_refresh_token()
@@ -105,7 +95,11 @@ class RefreshView(APIView):
 
         with transaction.atomic():
             try:
-                rtoken = RefreshToken.objects.select_for_update().get(token=old_token)
+                rtoken = (
+                    RefreshToken.objects.select_related("user")
+                    .select_for_update(of=("self",))
+                    .get(token=old_token)
+                )
             except RefreshToken.DoesNotExist:
                 logger.warning(f"Invalid refresh token used: {old_token}")
                 return Response({"detail": "Invalid refresh token."}, status=401)